@@ -0,0 +1,73 @@
+import time
+import numpy as np
+import pandas as pd
+
+from myhubeau._decode import _decode_pages
+
+
+def _generate_pages(n_records: int, page_size: int = 10000) -> list:
+    # mimic a consolidated hydrometry payload from Hub'Eau (obs_elab)
+    dates = pd.date_range('1960-01-01', periods=n_records, freq='D')
+    rng = np.random.default_rng(42)
+    records = [
+        {
+            'date_obs_elab': d.strftime('%Y-%m-%d'),
+            'resultat_obs_elab': float(v),
+            'code_qualification': int(q)
+        }
+        for d, v, q in zip(
+            dates, rng.gamma(2., 5000., n_records).round(1),
+            rng.choice([12, 16, 20], n_records)
+        )
+    ]
+
+    return [
+        records[i:i + page_size] for i in range(0, n_records, page_size)
+    ]
+
+
+def _decode_per_record(pages: list) -> pd.DataFrame:
+    # previous approach (one dataframe per record, then transposed)
+    data = [record for page in pages for record in page]
+    df = pd.concat(
+        [pd.DataFrame.from_dict(i, orient='index') for i in data],
+        axis=1
+    ).T
+    df['date_obs_elab'] = pd.to_datetime(
+        df['date_obs_elab'], format='%Y-%m-%d'
+    )
+
+    return df
+
+
+def _decode_columnar(pages: list) -> pd.DataFrame:
+    return _decode_pages(
+        pages,
+        fields=['date_obs_elab', 'resultat_obs_elab', 'code_qualification'],
+        dtypes={'resultat_obs_elab': 'float64', 'code_qualification': 'int8'},
+        date_formats={'date_obs_elab': '%Y-%m-%d'}
+    )
+
+
+def _time(func, pages: list, repeat: int) -> float:
+    best = np.inf
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        func(pages)
+        best = min(best, time.perf_counter() - tic)
+
+    return best
+
+
+if __name__ == '__main__':
+    for n in (1000, 5000, 20000):
+        pages = _generate_pages(n)
+
+        t_old = _time(_decode_per_record, pages, repeat=1)
+        t_new = _time(_decode_columnar, pages, repeat=5)
+
+        print(
+            f"{n:>6} records | per-record: {n / t_old:>12,.0f} rows/s "
+            f"| columnar: {n / t_new:>12,.0f} rows/s "
+            f"| speed-up: x{t_old / t_new:.0f}"
+        )
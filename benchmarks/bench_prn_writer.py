@@ -0,0 +1,64 @@
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+from mygardenia._prn import _write_prn_file
+
+
+def _generate_df(n_days: int) -> pd.DataFrame:
+    # mimic a daily streamflow series with a few missing values
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(
+        {
+            'Date': pd.date_range('1960-01-01', periods=n_days, freq='D'),
+            'Debit': rng.gamma(2., 50., n_days).round(3)
+        }
+    )
+    df.loc[::20, 'Debit'] = np.nan
+
+    return df
+
+
+def _write_with_to_csv(df: pd.DataFrame, filepath: str) -> None:
+    # previous approach (date strings formatted for each call, and
+    # missing values filled in before writing with pandas)
+    df = df.copy()
+    df['Date'] = df['Date'].dt.strftime('%d/%m/%Y')
+    if df['Debit'].isna().any():
+        df.loc[df['Debit'].isna(), 'Debit'] = -2
+    df.to_csv(filepath, index=False, sep='\t')
+
+
+def _write_with_prn_writer(df: pd.DataFrame, filepath: str) -> None:
+    _write_prn_file(filepath, df['Date'], {'Debit': df['Debit']}, -2)
+
+
+def _time(func, df: pd.DataFrame, tmp_dir: str, repeat: int) -> float:
+    best = np.inf
+    for i in range(repeat):
+        # write to a new file each time (since the PRN writer skips
+        # writing content already on disk)
+        filepath = os.sep.join([tmp_dir, f"{func.__name__}-{i}.prn"])
+
+        tic = time.perf_counter()
+        func(df, filepath)
+        best = min(best, time.perf_counter() - tic)
+
+    return best
+
+
+if __name__ == '__main__':
+    for n in (5000, 20000, 50000):
+        df = _generate_df(n)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            t_old = _time(_write_with_to_csv, df, tmp_dir, repeat=5)
+            t_new = _time(_write_with_prn_writer, df, tmp_dir, repeat=5)
+
+        print(
+            f"{n:>6} days | to_csv: {t_old * 1e3:>8.1f} ms "
+            f"| prn writer: {t_new * 1e3:>8.1f} ms "
+            f"| speed-up: x{t_old / t_new:.0f}"
+        )
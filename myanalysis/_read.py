@@ -2,15 +2,23 @@ import os
 import pandas as pd
 import numpy as np
 
+from mygardenia._prn import _read_prn_sidecar
+
 
 def read_prn_file(
         working_dir: str, filename: str,
         variable: str, missing_value: float = None
 ) -> pd.DataFrame:
-    df = pd.read_csv(
-        os.sep.join([working_dir, 'data', filename]),
-        delimiter='\t', parse_dates=['Date'], date_format='%d/%m/%Y'
-    )
+    filepath = os.sep.join([working_dir, 'data', filename])
+
+    # prefer binary copy of PRN file (if up to date)
+    df = _read_prn_sidecar(filepath)
+
+    if df is None:
+        df = pd.read_csv(
+            filepath,
+            delimiter='\t', parse_dates=['Date'], date_format='%d/%m/%Y'
+        )
 
     if missing_value is not None:
         df.loc[df[variable] == missing_value, variable] = np.nan
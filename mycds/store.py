@@ -8,6 +8,7 @@ import xarray as xr
 from .collect import (
     get_total_precipitation, get_potential_evaporation, get_2m_air_temperature
 )
+from mygardenia._prn import _write_prn_file
 
 
 def _manage_working_directory(working_dir: str):
@@ -22,7 +23,7 @@ def _save_data_as_prn_file(
         da: xr.DataArray, var: str, variable: str,
         working_dir: str, filename: str = None,
         start: str = None, end: str = None
-) -> None:
+) -> bool:
     # deal with working directory
     _manage_working_directory(working_dir)
 
@@ -44,21 +45,18 @@ def _save_data_as_prn_file(
         else datetime.strptime(end, '%Y-%m-%d')
     )
 
-    df = df.set_index('Date')
-    df = df.reindex(pd.date_range(start, end), fill_value=np.nan)
-    df = df.reset_index(names='Date')
-
-    # convert to "excel" date for Gardenia
-    df['Date'] = df['Date'].dt.strftime('%d/%m/%Y')
+    dates = pd.date_range(start, end)
+    values = df.set_index('Date')[variable].reindex(dates).values
 
     filename = (
         filename if filename
         else f"my-{variable.lower().replace(' ', '-')}.prn"
     )
 
-    df.to_csv(
+    # save as PRN file (with "excel" dates for Gardenia)
+    return _write_prn_file(
         os.sep.join([working_dir, "data", filename]),
-        index=False, sep='\t'
+        dates, {variable: values}
     )
 
 
@@ -103,7 +101,10 @@ def save_total_precipitation(
 
     :Returns:
 
-        `None`
+        `bool`
+            Whether the PRN file was written, i.e. `False` if it already
+            existed with the same content (in which case it is left
+            untouched).
 
     **Examples**
 
@@ -125,7 +126,7 @@ def save_total_precipitation(
     da = da.resample(valid_time='1D', origin='end_day').sum()
 
     # store as PRN file
-    _save_data_as_prn_file(
+    return _save_data_as_prn_file(
         da, 'tp', 'Total precipitation', working_dir, filename, start, end
     )
 
@@ -171,7 +172,10 @@ def save_potential_evaporation(
 
     :Returns:
 
-        `None`
+        `bool`
+            Whether the PRN file was written, i.e. `False` if it already
+            existed with the same content (in which case it is left
+            untouched).
 
     **Examples**
 
@@ -196,7 +200,7 @@ def save_potential_evaporation(
     da = da.resample(valid_time='1D', origin='end_day').sum()
 
     # store as PRN file
-    _save_data_as_prn_file(
+    return _save_data_as_prn_file(
         da, 'pev', 'Potential evaporation', working_dir, filename, start, end
     )
 
@@ -242,7 +246,10 @@ def save_2m_air_temperature(
 
     :Returns:
 
-        `None`
+        `bool`
+            Whether the PRN file was written, i.e. `False` if it already
+            existed with the same content (in which case it is left
+            untouched).
 
     **Examples**
 
@@ -264,6 +271,6 @@ def save_2m_air_temperature(
     da = da.resample(valid_time='1D', origin='end_day').mean()
 
     # store as PRN file
-    _save_data_as_prn_file(
+    return _save_data_as_prn_file(
         da, 't2m', '2m air temperature', working_dir, filename, start, end
     )
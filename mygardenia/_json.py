@@ -0,0 +1,60 @@
+import os
+import json
+import time
+import warnings
+from typing import Callable
+from requests.exceptions import RequestException
+
+from ._prn import _write_atomically
+
+
+def _read_json_cache(filename: str) -> tuple:
+    try:
+        with open(filename, 'r') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+
+    return cache['content'], cache['timestamp']
+
+
+def _write_json_cache(filename: str, content) -> float:
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    timestamp = time.time()
+
+    _write_atomically(
+        filename,
+        lambda f: f.write(
+            json.dumps({'timestamp': timestamp, 'content': content}).encode()
+        )
+    )
+
+    return timestamp
+
+
+def _load_json_cache(
+        filename: str, ttl: float, fetch: Callable, refresh: bool = False,
+        label: str = 'cache'
+) -> tuple:
+    # (returns content along with the time it was collected at)
+    content, timestamp = _read_json_cache(filename)
+
+    # use cached content if still fresh
+    if (not refresh) and (content is not None):
+        if time.time() - timestamp <= ttl:
+            return content, timestamp
+
+    try:
+        fresh_content = fetch()
+    except (RuntimeError, RequestException) as e:
+        # fall back on stale content if API is unreachable
+        if content is not None:
+            warnings.warn(
+                f"{label} could not be refreshed ({e}), using cached "
+                f"version from {(time.time() - timestamp) / 3600:.1f} "
+                f"hours ago"
+            )
+            return content, timestamp
+        raise
+
+    return fresh_content, _write_json_cache(filename, fresh_content)
@@ -0,0 +1,185 @@
+import os
+import hashlib
+import threading
+from typing import Callable
+import numpy as np
+import pandas as pd
+
+# "global" (module-wide) variables for caching "excel" date strings
+# (i.e. 'dd/mm/YYYY') over the range of dates commonly written
+_date_strings_origin = np.datetime64('1900-01-01', 'D')
+_date_strings_end = np.datetime64('2101-01-01', 'D')
+_date_strings = None
+
+
+def _get_date_strings(dates) -> np.ndarray:
+    global _date_strings
+
+    days = np.asarray(dates).astype('datetime64[D]')
+
+    # fall back on formatting dates individually outside cached range
+    if days.size and (
+            (days.min() < _date_strings_origin)
+            or (days.max() >= _date_strings_end)
+    ):
+        return np.asarray(pd.DatetimeIndex(days).strftime('%d/%m/%Y'))
+
+    # format all dates in cached range once
+    if _date_strings is None:
+        _date_strings = np.asarray(
+            pd.date_range(
+                _date_strings_origin, _date_strings_end, freq='D',
+                inclusive='left'
+            ).strftime('%d/%m/%Y')
+        )
+
+    # look up dates by their offset from start of cached range
+    return _date_strings[(days - _date_strings_origin).astype(np.int64)]
+
+
+def _get_value_strings(values, missing_value: float = np.nan) -> list:
+    values = np.asarray(values)
+
+    if values.dtype == np.float64:
+        # format numbers in bulk (using shortest round-tripping repr,
+        # which is much faster on Python floats than on numpy scalars)
+        strings = list(map(repr, values.tolist()))
+    else:
+        strings = values.astype(str).tolist()
+
+    # fill in missing values with missing value flag in the same pass
+    missing = np.flatnonzero(pd.isna(values))
+    if missing.size:
+        if np.isnan(missing_value):
+            missing_string = ''
+        elif values.dtype.kind == 'f':
+            missing_string = str(np.asarray(missing_value, values.dtype))
+        else:
+            missing_string = str(missing_value)
+
+        for i in missing:
+            strings[i] = missing_string
+
+    return strings
+
+
+def _write_atomically(filepath: str, write: Callable) -> None:
+    # write to temporary file first so that a crash never leaves
+    # a truncated file behind
+    tmp_filepath = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_filepath, 'wb') as f:
+        write(f)
+    os.replace(tmp_filepath, filepath)
+
+
+def _get_sidecar_filepath(filepath: str) -> str:
+    return f"{filepath}.npz"
+
+
+def _get_sidecar_hash(filepath: str) -> str | None:
+    # hash of PRN file content the binary copy was written from
+    try:
+        with np.load(_get_sidecar_filepath(filepath)) as content:
+            return str(content['source'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_prn_sidecar(
+        filepath: str, source_hash: str, dates, columns: dict,
+        missing_value: float = np.nan
+) -> None:
+    values = []
+    for column in columns.values():
+        column = np.asarray(column)
+
+        # only numeric series can be stored in binary copy
+        if column.dtype.kind not in 'fiub':
+            return
+
+        # store values as they read from PRN file (i.e. with the shortest
+        # repr of single precision values, and with missing value flag)
+        column = (
+            column.astype(str).astype('float64')
+            if column.dtype.kind == 'f' and column.dtype != np.float64
+            else column.astype('float64')
+        )
+        if not np.isnan(missing_value):
+            column[np.isnan(column)] = missing_value
+
+        values.append(column)
+
+    _write_atomically(
+        _get_sidecar_filepath(filepath),
+        lambda f: np.savez(
+            f,
+            dates=np.asarray(dates).astype('datetime64[D]'),
+            names=np.array(list(columns), dtype=str),
+            values=np.column_stack(values),
+            source=np.array(source_hash)
+        )
+    )
+
+
+def _read_prn_sidecar(filepath: str) -> pd.DataFrame | None:
+    try:
+        with np.load(_get_sidecar_filepath(filepath)) as content:
+            source = str(content['source'])
+            dates = content['dates']
+            names = content['names']
+            values = content['values']
+    except (OSError, ValueError, KeyError):
+        return None
+
+    # binary copy is only trusted if written from current PRN file
+    # content (modification times are too coarse or easily reordered
+    # by copies and checkouts to be relied on)
+    if source != _get_file_hash(filepath):
+        return None
+
+    return pd.DataFrame(
+        {'Date': dates.astype('datetime64[ns]')}
+        | {name: values[:, j] for j, name in enumerate(names.tolist())}
+    )
+
+
+def _get_file_hash(filepath: str) -> str | None:
+    try:
+        with open(filepath, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _write_prn_file(
+        filepath: str, dates, columns: dict, missing_value: float = np.nan
+) -> bool:
+    # format each column as strings in bulk
+    fields = [_get_date_strings(dates)] + [
+        _get_value_strings(values, missing_value)
+        for values in columns.values()
+    ]
+
+    # assemble tab-separated lines at once
+    lines = ['\t'.join(['Date'] + list(columns))]
+    lines.extend(map('\t'.join, zip(*fields)))
+    content = (os.linesep.join(lines) + os.linesep).encode()
+
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    # skip writing (leaving modification time untouched) if file content
+    # would not change
+    if _get_file_hash(filepath) == content_hash:
+        # make sure binary copy matches anyway
+        if _get_sidecar_hash(filepath) != content_hash:
+            _write_prn_sidecar(
+                filepath, content_hash, dates, columns, missing_value
+            )
+        return False
+
+    _write_atomically(filepath, lambda f: f.write(content))
+
+    # also store binary copy for fast reading
+    _write_prn_sidecar(filepath, content_hash, dates, columns, missing_value)
+
+    return True
@@ -0,0 +1,194 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import myhubeau.collect
+import mymeteofrance.collect
+from myhubeau.store import save_hydrometry, save_piezometry, save_withdrawal
+from mymeteofrance.store import save_meteorology
+
+
+# functions to use to store each kind of data (taking manifest item)
+_savers = {
+    'hydrometry': lambda item, api_key: save_hydrometry(
+        code_station=item['station'], working_dir=item['working_dir'],
+        filename=item.get('filename'),
+        start=item.get('start'), end=item.get('end'),
+        **item.get('options', {})
+    ),
+    'piezometry': lambda item, api_key: save_piezometry(
+        code_bss=item['station'], working_dir=item['working_dir'],
+        filename=item.get('filename'),
+        start=item.get('start'), end=item.get('end'),
+        **item.get('options', {})
+    ),
+    'withdrawal': lambda item, api_key: save_withdrawal(
+        code_ouvrage=item['station'], working_dir=item['working_dir'],
+        filename=item.get('filename'),
+        start=item.get('start'), end=item.get('end'),
+        **item.get('options', {})
+    ),
+    'meteorology': lambda item, api_key: save_meteorology(
+        variables=item['variables'], station_id=item['station'],
+        api_key=item.get('api_key', api_key),
+        working_dir=item['working_dir'], filename=item.get('filename'),
+        start=item.get('start'), end=item.get('end'),
+        **item.get('options', {})
+    )
+}
+
+
+def _get_meteorology_api_key(manifest: list, api_key: str = None):
+    # use key given for all items, or else key of first item giving one
+    if api_key is not None:
+        return api_key
+
+    return next(
+        (
+            item['api_key'] for item in manifest
+            if (item.get('kind') == 'meteorology') and item.get('api_key')
+        ),
+        None
+    )
+
+
+def _load_referentials(manifest: list, api_key: str = None) -> dict:
+    # collect station referentials once (if not already collected) so
+    # that concurrent exports share them rather than each collecting them
+    # (and keep the error for each kind whose referential failed)
+    errors = {}
+
+    for kind in dict.fromkeys(item['kind'] for item in manifest):
+        try:
+            if (kind == 'hydrometry') and (
+                    myhubeau.collect._hydrometry_stations is None
+            ):
+                myhubeau.collect._set_and_get_hydrometry_stations()
+            elif (kind == 'piezometry') and (
+                    myhubeau.collect._piezometry_stations is None
+            ):
+                myhubeau.collect._set_and_get_piezometry_stations()
+            elif (kind == 'withdrawal') and (
+                    myhubeau.collect._withdrawal_stations is None
+            ):
+                myhubeau.collect._set_and_get_withdrawal_stations()
+            elif kind == 'meteorology':
+                meteorology_api_key = _get_meteorology_api_key(
+                    manifest, api_key
+                )
+                if meteorology_api_key is not None:
+                    mymeteofrance.collect._load_meteorology_catalogue(
+                        meteorology_api_key
+                    )
+        except Exception as e:
+            errors[kind] = f"{type(e).__name__}: {e}"
+
+    return errors
+
+
+def _export_item(
+        index: int, item: dict, api_key: str = None, error: str = None
+) -> dict:
+    report = {
+        'index': index,
+        'station': item.get('station'),
+        'kind': item.get('kind'),
+        'working_dir': item.get('working_dir'),
+        'status': 'success',
+        'error': None,
+        'written': None
+    }
+
+    tic = time.perf_counter()
+    if error is not None:
+        # do not try again to collect a referential that already failed
+        report['status'] = 'failure'
+        report['error'] = f"station referential unavailable ({error})"
+    else:
+        try:
+            report['written'] = _savers[item['kind']](item, api_key)
+        except Exception as e:
+            report['status'] = 'failure'
+            report['error'] = f"{type(e).__name__}: {e}"
+    report['duration'] = time.perf_counter() - tic
+
+    return report
+
+
+def export_many(
+        manifest: list, api_key: str = None, max_workers: int = 4
+) -> list:
+    """Generate the PRN files for many stations and working directories
+    at once, collecting and storing data for several items of the
+    manifest concurrently.
+
+    :Parameters:
+
+        manifest: `list`
+            The items to export, each item being a dictionary with keys
+            *station* (the code of the station or its ID for
+            meteorology), *kind* (one of `'hydrometry'`, `'piezometry'`,
+            `'withdrawal'`, and `'meteorology'`), and *working_dir* (the
+            file path the working directory to use to store the data),
+            and optionally with keys *filename*, *start*, and *end* (see
+            the corresponding `save_*` functions), *variables* (required
+            for meteorology), *api_key* (to override the key given for
+            all meteorology items), and *options* (a dictionary of any
+            other keyword argument to give to the `save_*` function).
+
+        api_key: `str`, optional
+            The API key to use for the meteorology items of the manifest.
+            It is only required if the manifest contains meteorology
+            items that do not specify their own *api_key*.
+
+        max_workers: `int`, optional
+            The maximum number of items exported concurrently. If not
+            provided, set to default value `4`.
+
+    :Returns:
+
+        `list`
+            The report for each item of the manifest (in the same order),
+            i.e. a dictionary with keys *index* (the position of the item
+            in the manifest), *station*, *kind*, *working_dir*, *status*
+            (`'success'` or `'failure'`), *error* (the error message if
+            the export failed, `None` otherwise), *written* (whether the
+            PRN file(s) were written or left untouched because unchanged,
+            as returned by the `save_*` function), and *duration* (the
+            time taken in seconds).
+
+    **Examples**
+
+    Generating streamflow and piezometric level PRN files for two
+    working directories:
+
+    >>> export_many(
+    ...     [
+    ...         {'station': 'M107302001', 'kind': 'hydrometry',
+    ...          'working_dir': 'examples/my-example'},
+    ...         {'station': '00755X0006/P1', 'kind': 'piezometry',
+    ...          'working_dir': 'examples/my-example-2',
+    ...          'start': '2000-01-01'}
+    ...     ]
+    ... )  # doctest: +SKIP
+    """
+    for item in manifest:
+        if item.get('kind') not in _savers:
+            raise ValueError(
+                f"kind {repr(item.get('kind'))} is not valid, it must "
+                f"be one of {', '.join(map(repr, _savers))}"
+            )
+
+    # share station referentials across all items (if they cannot be
+    # collected now, the failure is reported for each item concerned)
+    errors = _load_referentials(manifest, api_key)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            executor.map(
+                lambda args: _export_item(
+                    *args, api_key=api_key,
+                    error=errors.get(args[1]['kind'])
+                ),
+                enumerate(manifest)
+            )
+        )
@@ -0,0 +1,181 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable
+import pandas as pd
+
+from mygardenia._json import _load_json_cache
+
+
+# "global" (module-wide) variables for caching settings
+_cache_settings = {
+    'directory': os.sep.join([os.path.dirname(__file__), "database"]),
+    # one week
+    'ttl': 7 * 24 * 3600,
+    # 256 MiB
+    'max_raw_memory': 256 * 2 ** 20,
+    # fifteen minutes
+    'raw_ttl': 15 * 60
+}
+
+# "global" (module-wide) variables for in-memory caching of raw responses
+# (i.e. {key: (timestamp, size, content)} in order of use)
+_raw_cache = OrderedDict()
+_raw_cache_usage = {'bytes': 0}
+_raw_cache_lock = threading.Lock()
+
+
+def _get_cache_filename(name: str) -> str:
+    return os.sep.join(
+        [_cache_settings['directory'], f"referentiel_{name}.json"]
+    )
+
+
+def _load_referential(name: str, fetch: Callable, refresh: bool = False):
+    content, _ = _load_json_cache(
+        _get_cache_filename(name), _cache_settings['ttl'], fetch, refresh,
+        f"{name} referential"
+    )
+
+    return content
+
+
+def _get_memory_size(content) -> int:
+    if isinstance(content, pd.DataFrame):
+        return int(content.memory_usage(index=True, deep=True).sum())
+    if isinstance(content, dict):
+        return sum(_get_memory_size(value) for value in content.values())
+
+    return 0
+
+
+def _discard_raw(key: tuple) -> None:
+    # (to be called while holding the lock)
+    _, size, _ = _raw_cache.pop(key)
+    _raw_cache_usage['bytes'] -= size
+
+
+def _evict_raw() -> None:
+    # (to be called while holding the lock)
+    now = time.monotonic()
+
+    # discard expired responses
+    for key in [
+        key for key, (stored, _, _) in _raw_cache.items()
+        if now - stored > _cache_settings['raw_ttl']
+    ]:
+        _discard_raw(key)
+
+    # discard least recently used responses until back within budget
+    while _raw_cache and (
+            _raw_cache_usage['bytes'] > _cache_settings['max_raw_memory']
+    ):
+        _discard_raw(next(iter(_raw_cache)))
+
+
+def _load_raw(key: tuple, fetch: Callable):
+    with _raw_cache_lock:
+        if key in _raw_cache:
+            stored, _, content = _raw_cache[key]
+            if time.monotonic() - stored <= _cache_settings['raw_ttl']:
+                # mark as most recently used
+                _raw_cache.move_to_end(key)
+                return content
+            _discard_raw(key)
+
+    content = fetch()
+    size = _get_memory_size(content)
+
+    with _raw_cache_lock:
+        # only keep responses that fit in the memory budget on their own
+        if size <= _cache_settings['max_raw_memory']:
+            if key in _raw_cache:
+                _discard_raw(key)
+            _raw_cache[key] = (time.monotonic(), size, content)
+            _raw_cache_usage['bytes'] += size
+            _evict_raw()
+
+    return content
+
+
+def clear_cache() -> None:
+    """Discard all the raw observations kept in memory, so that the next
+    queries collect them again from Hub'Eau (the station referentials
+    cached on disk are left untouched, see `refresh_referentials` to
+    collect them again).
+
+    :Returns:
+
+        `None`
+
+    **Examples**
+
+    >>> clear_cache()
+    """
+    with _raw_cache_lock:
+        _raw_cache.clear()
+        _raw_cache_usage['bytes'] = 0
+
+
+def configure_cache(
+        directory: str = None, ttl: float = None,
+        max_raw_memory: int = None, raw_ttl: float = None
+) -> None:
+    """Configure the on-disk cache used to store the station referentials
+    collected from Hub'Eau, and the in-memory cache used to store the raw
+    observations collected from Hub'Eau (before quality filtering and
+    daily aggregation).
+
+    :Parameters:
+
+        directory: `str`, optional
+            The file path to the directory where to store the cached
+            referentials. If not provided, the current value is kept
+            (default value is the *database* directory of the module).
+
+        ttl: `float`, optional
+            The time to live (in seconds) of the cached referentials,
+            beyond which they are collected again from Hub'Eau. If not
+            provided, the current value is kept (default value is one
+            week, i.e. `604800`).
+
+        max_raw_memory: `int`, optional
+            The maximum memory (in bytes) taken by the raw observations
+            kept in memory, the least recently used being discarded first
+            (`0` to bypass and clear the cache). If not provided, the
+            current value is kept (default value is 256 MiB, i.e.
+            `268435456`).
+
+        raw_ttl: `float`, optional
+            The time to live (in seconds) of the raw observations kept in
+            memory, beyond which they are collected again from Hub'Eau.
+            If not provided, the current value is kept (default value is
+            fifteen minutes, i.e. `900`).
+
+    :Returns:
+
+        `None`
+
+    **Examples**
+
+    Refreshing station referentials daily:
+
+    >>> configure_cache(ttl=24 * 3600)
+
+    Collecting observations from Hub'Eau for every query:
+
+    >>> configure_cache(max_raw_memory=0)
+    """
+    if directory is not None:
+        _cache_settings['directory'] = directory
+    if ttl is not None:
+        _cache_settings['ttl'] = ttl
+    if max_raw_memory is not None:
+        _cache_settings['max_raw_memory'] = max_raw_memory
+    if raw_ttl is not None:
+        _cache_settings['raw_ttl'] = raw_ttl
+
+    # apply new limits to observations already kept in memory
+    with _raw_cache_lock:
+        _evict_raw()
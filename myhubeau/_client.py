@@ -0,0 +1,307 @@
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# "global" (module-wide) variables for connection pooling
+_session = None
+_session_lock = threading.Lock()
+
+_client_settings = {
+    'pool_connections': 10,
+    'pool_maxsize': 10,
+    'keep_alive': True,
+    'timeout': (10, 120),
+    'rate': 20.,
+    'burst': 20,
+    'max_retries': 5,
+    'backoff_factor': 1.,
+    'backoff_max': 60.
+}
+
+# HTTP status codes worth trying again (rate limited or server overloaded)
+_retryable_status_codes = (429, 500, 502, 503, 504)
+
+# "global" (module-wide) variables for monitoring retries
+_retry_stats = {'retries': 0, 'failures': 0, 'status_codes': {}}
+_retry_stats_lock = threading.Lock()
+
+
+class _TokenBucket(object):
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.rate:
+            return
+
+        with self._lock:
+            # refill bucket according to time elapsed since last request
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+
+            # reserve a token (possibly in advance) and work out how long
+            # to wait for it to become available
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+_bucket = _TokenBucket(_client_settings['rate'], _client_settings['burst'])
+
+
+def _create_session() -> requests.Session:
+    session = requests.Session()
+
+    # mount pooled adapter for both schemes
+    adapter = HTTPAdapter(
+        pool_connections=_client_settings['pool_connections'],
+        pool_maxsize=_client_settings['pool_maxsize'],
+        pool_block=False
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    # ask server to close connection after each response if required
+    if not _client_settings['keep_alive']:
+        session.headers['Connection'] = 'close'
+
+    return session
+
+
+def _get_session() -> requests.Session:
+    global _session
+
+    # create shared session (if not already created)
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+
+    return _session
+
+
+def _get_backoff_delay(attempt: int, response: requests.Response = None):
+    # respect delay requested by server (if any)
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), _client_settings['backoff_max'])
+
+    # exponential backoff with full jitter
+    return random.uniform(
+        0, min(
+            _client_settings['backoff_max'],
+            _client_settings['backoff_factor'] * 2 ** attempt
+        )
+    )
+
+
+def _record_retry(reason) -> None:
+    with _retry_stats_lock:
+        _retry_stats['retries'] += 1
+        _retry_stats['status_codes'][reason] = (
+            _retry_stats['status_codes'].get(reason, 0) + 1
+        )
+
+
+def _get(url: str, **kwargs) -> requests.Response:
+    timeout = kwargs.pop('timeout', _client_settings['timeout'])
+
+    for attempt in range(_client_settings['max_retries'] + 1):
+        last_attempt = attempt == _client_settings['max_retries']
+
+        # wait for permission to send request
+        _bucket.acquire()
+
+        try:
+            r = _get_session().get(url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if last_attempt:
+                with _retry_stats_lock:
+                    _retry_stats['failures'] += 1
+                raise
+            _record_retry(type(e).__name__)
+            time.sleep(_get_backoff_delay(attempt))
+            continue
+
+        if (r.status_code not in _retryable_status_codes) or last_attempt:
+            if r.status_code in _retryable_status_codes:
+                with _retry_stats_lock:
+                    _retry_stats['failures'] += 1
+            return r
+
+        _record_retry(r.status_code)
+        time.sleep(_get_backoff_delay(attempt, r))
+
+
+def configure_client(
+        pool_connections: int = None, pool_maxsize: int = None,
+        keep_alive: bool = None, timeout: float | tuple = None,
+        rate: float = None, burst: int = None, max_retries: int = None,
+        backoff_factor: float = None, backoff_max: float = None
+) -> None:
+    """Configure the connection-pooled HTTP client shared by all
+    queries sent to Hub'Eau.
+
+    :Parameters:
+
+        pool_connections: `int`, optional
+            The number of distinct hosts for which a pool of connections
+            is kept. If not provided, the current value is kept (default
+            value is `10`).
+
+        pool_maxsize: `int`, optional
+            The maximum number of connections kept alive per host (i.e.
+            the maximum number of concurrent requests to a given host
+            that can reuse a connection). If not provided, the current
+            value is kept (default value is `10`).
+
+        keep_alive: `bool`, optional
+            Whether to keep connections open between requests. If not
+            provided, the current value is kept (default value is `True`).
+
+        timeout: `float` or `tuple`, optional
+            The timeout (in seconds) to use for each request, either as
+            a single value or as a tuple (*connect*, *read*). If not
+            provided, the current value is kept (default value is
+            `(10, 120)`).
+
+        rate: `float`, optional
+            The maximum sustained number of requests per second sent to
+            Hub'Eau (`0` to disable rate limiting). If not provided, the
+            current value is kept (default value is `20`).
+
+        burst: `int`, optional
+            The maximum number of requests that can be sent in a burst
+            above the sustained rate. If not provided, the current value
+            is kept (default value is `20`).
+
+        max_retries: `int`, optional
+            The maximum number of times a request is tried again after a
+            connection error or a retryable HTTP status (429, 500, 502,
+            503, 504). If not provided, the current value is kept
+            (default value is `5`).
+
+        backoff_factor: `float`, optional
+            The base delay (in seconds) of the exponential backoff between
+            retries, the actual delay being drawn at random between zero
+            and *backoff_factor* × 2^*attempt*. If not provided, the
+            current value is kept (default value is `1`).
+
+        backoff_max: `float`, optional
+            The maximum delay (in seconds) between two retries. If not
+            provided, the current value is kept (default value is `60`).
+
+    :Returns:
+
+        `None`
+
+    **Examples**
+
+    Allowing up to 20 concurrent connections to Hub'Eau with a longer
+    read timeout:
+
+    >>> configure_client(pool_maxsize=20, timeout=(10, 300))
+    """
+    global _session
+
+    for key, value in (
+            ('pool_connections', pool_connections),
+            ('pool_maxsize', pool_maxsize),
+            ('keep_alive', keep_alive),
+            ('timeout', timeout),
+            ('rate', rate),
+            ('burst', burst),
+            ('max_retries', max_retries),
+            ('backoff_factor', backoff_factor),
+            ('backoff_max', backoff_max)
+    ):
+        if value is not None:
+            _client_settings[key] = value
+
+    # apply rate limiting settings
+    with _bucket._lock:
+        _bucket.rate = _client_settings['rate']
+        _bucket.capacity = _client_settings['burst']
+
+    # discard current session so that new settings apply to next request
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_connection_stats() -> dict:
+    """Report, for each host queried so far, the number of connections
+    opened and the number of times an already open connection was reused.
+
+    :Returns:
+
+        `dict`
+            The dictionary containing, for each host (as keys), a
+            dictionary with the number of *requests* sent, the number
+            of connections *opened*, and the number of connections
+            *reused*.
+
+    **Examples**
+
+    >>> get_connection_stats()  # doctest: +SKIP
+    {'hubeau.eaufrance.fr': {'requests': 12, 'opened': 1, 'reused': 11}}
+    """
+    stats = {}
+
+    if _session is None:
+        return stats
+
+    for adapter in set(_session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+
+            host = stats.setdefault(
+                key.key_host, {'requests': 0, 'opened': 0, 'reused': 0}
+            )
+            host['requests'] += pool.num_requests
+            host['opened'] += pool.num_connections
+            host['reused'] += max(pool.num_requests - pool.num_connections, 0)
+
+    return stats
+
+
+def get_retry_stats() -> dict:
+    """Report the number of requests to Hub'Eau that were tried again,
+    and the number of requests that still failed after all retries.
+
+    :Returns:
+
+        `dict`
+            The dictionary containing the total number of *retries*, the
+            number of *failures* (i.e. requests abandoned after the
+            maximum number of retries), and the number of retries per
+            HTTP status code or connection error (*status_codes*).
+
+    **Examples**
+
+    >>> get_retry_stats()  # doctest: +SKIP
+    {'retries': 3, 'failures': 0, 'status_codes': {503: 2, 429: 1}}
+    """
+    with _retry_stats_lock:
+        return {
+            'retries': _retry_stats['retries'],
+            'failures': _retry_stats['failures'],
+            'status_codes': dict(_retry_stats['status_codes'])
+        }
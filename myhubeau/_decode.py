@@ -0,0 +1,149 @@
+from typing import Iterable
+import numpy as np
+import pandas as pd
+
+
+def _to_array(values: list, dtype: str = None, date_format: str = None):
+    if date_format is not None:
+        return pd.to_datetime(values, format=date_format).values
+    if dtype is None:
+        # let pandas infer type (e.g. strings or numbers)
+        return pd.Series(values).values
+    if dtype == 'category':
+        return pd.Categorical(values)
+
+    try:
+        return np.array(values, dtype=dtype)
+    except (TypeError, ValueError):
+        # missing values cannot be stored in integer arrays,
+        # so fall back on categorical codes
+        return pd.Categorical(values)
+
+
+def _decode_pages(
+        pages: Iterable[list], fields: list = None,
+        dtypes: dict = None, date_formats: dict = None
+) -> pd.DataFrame | None:
+    dtypes = dtypes if dtypes else {}
+    date_formats = date_formats if date_formats else {}
+
+    # accumulate values field by field (rather than record by record)
+    columns = {field: [] for field in fields} if fields else None
+
+    for page in pages:
+        if not page:
+            continue
+
+        # infer fields from first record if not provided
+        if columns is None:
+            columns = {field: [] for field in page[0]}
+
+        for field, values in columns.items():
+            values.extend([record.get(field) for record in page])
+
+    # check whether at least one record exists
+    if not columns or not next(iter(columns.values())):
+        return None
+
+    # convert each field into a typed array in one go
+    return pd.DataFrame(
+        {
+            field: _to_array(
+                values, dtypes.get(field), date_formats.get(field)
+            )
+            for field, values in columns.items()
+        }
+    )
+
+
+# running accumulators kept for each day (page-wise reduction, and how
+# to fold it into the running value)
+_daily_accumulators = {
+    'sum': np.add,
+    'count': np.add,
+    'min': np.fmin,
+    'max': np.fmax
+}
+
+
+def _accumulate_daily_pages(
+        pages: Iterable[list], date_field: str, date_format: str,
+        measure_field: str, split_field: str = None
+) -> dict:
+    # running daily accumulators for each station, i.e.
+    # {station: {day: [sum, count, min, max]}}
+    accumulators = {}
+
+    for page in pages:
+        if not page:
+            continue
+
+        # reduce page to daily values (raw records are then discarded)
+        reduced = pd.DataFrame(
+            {
+                'station': (
+                    [record.get(split_field) for record in page]
+                    if split_field else None
+                ),
+                'day': pd.to_datetime(
+                    [record.get(date_field) for record in page],
+                    format=date_format
+                ).floor('D'),
+                'value': np.array(
+                    [record.get(measure_field) for record in page],
+                    dtype='float64'
+                )
+            }
+        ).groupby(['station', 'day'], dropna=False)['value'].agg(
+            list(_daily_accumulators)
+        )
+
+        # fold daily values of page into running accumulators
+        for (station, day), values in zip(
+                reduced.index, reduced.to_numpy(dtype='float64')
+        ):
+            # (single-station queries are gathered under None since
+            # missing station keys come back as distinct NaNs)
+            days = accumulators.setdefault(
+                station if split_field else None, {}
+            )
+            if day in days:
+                days[day] = [
+                    fold(running, value) for fold, running, value in zip(
+                        _daily_accumulators.values(), days[day], values
+                    )
+                ]
+            else:
+                days[day] = list(values)
+
+    return {
+        station: pd.DataFrame(
+            list(days.values()), index=pd.DatetimeIndex(list(days.keys())),
+            columns=list(_daily_accumulators)
+        ).sort_index()
+        for station, days in accumulators.items()
+    }
+
+
+def _aggregate_daily(
+        accumulators: pd.DataFrame, aggregation_method: str = 'mean'
+) -> pd.Series:
+    if aggregation_method == 'mean':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = (
+                accumulators['sum'].values / accumulators['count'].values
+            )
+    elif aggregation_method in ('sum', 'min', 'max'):
+        values = accumulators[aggregation_method].to_numpy(copy=True)
+    else:
+        raise ValueError(
+            f"aggregation method {repr(aggregation_method)} not supported"
+        )
+    # days without any valid reading are missing values
+    values[accumulators['count'].values == 0] = np.nan
+
+    # gap-fill into a continuous daily series
+    index = accumulators.index
+    return pd.Series(values, index=index).reindex(
+        pd.date_range(index.min(), index.max(), freq='D')
+    )
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+
+def _get_index(dates: list, freq: str = 'D') -> pd.DatetimeIndex | None:
+    dates = [d for d in dates if (d is not None) and len(d)]
+    if not dates:
+        return None
+
+    # span all sources with a regular index (gap-filling missing dates)
+    return pd.date_range(
+        min(d.min() for d in dates), max(d.max() for d in dates), freq=freq
+    )
+
+
+def _fill(
+        out: np.ndarray, index: pd.DatetimeIndex,
+        dates: np.ndarray, values: np.ndarray
+) -> None:
+    # locate dates in pre-allocated index and only write valid values
+    # (so that missing values never overwrite values from other sources)
+    positions = index.get_indexer(pd.DatetimeIndex(dates))
+    valid = (positions >= 0) & ~np.isnan(values)
+    out[positions[valid]] = values[valid]
+
+
+def _merge_series(
+        index: pd.DatetimeIndex, sources: list, dtype: str = 'float64'
+) -> np.ndarray:
+    # sources are (dates, values) pairs in increasing order of precedence
+    out = np.full(len(index), np.nan, dtype=dtype)
+    for dates, values in sources:
+        _fill(out, index, dates, values)
+
+    return out
+
+
+def _merge_many(
+        index: pd.DatetimeIndex, sources: list, dtype: str = 'float64'
+) -> np.ndarray:
+    # allocate a single 2-D array (dates × stations) and fill each station
+    # column from its sources in increasing order of precedence
+    out = np.full((len(index), len(sources)), np.nan, dtype=dtype)
+    for j, station_sources in enumerate(sources):
+        for dates, values in station_sources:
+            _fill(out[:, j], index, dates, values)
+
+    return out
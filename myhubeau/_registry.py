@@ -0,0 +1,249 @@
+import collections.abc
+import numpy as np
+import pandas as pd
+
+
+class StationRegistry(collections.abc.Mapping):
+    def __init__(
+            self, codes: list, departement: list = None, milieu: list = None,
+            en_service: list = None,
+            longitude: list = None, latitude: list = None
+    ):
+        """Initialise a registry of stations indexed by their codes and
+        holding compact metadata for each station.
+
+        :Parameters:
+
+            codes: `list`
+                The codes of the stations. Duplicate codes are only
+                registered once (the first occurrence is kept).
+
+            departement: `list`, optional
+                The departement code of each station.
+
+            milieu: `list`, optional
+                The type of environment of each station (e.g. `'CONT'`
+                for surface water or `'SOUT'` for groundwater).
+
+            en_service: `list`, optional
+                Whether each station is still in operation.
+
+            longitude: `list`, optional
+                The longitude of each station (in degrees East).
+
+            latitude: `list`, optional
+                The latitude of each station (in degrees North).
+
+        :Returns:
+
+            `StationRegistry`
+
+        **Examples**
+
+        >>> r = StationRegistry(
+        ...     codes=['M107302001', 'M108201001'],
+        ...     departement=['76', '76'], en_service=[True, False]
+        ... )
+        >>> 'M107302001' in r
+        True
+        >>> r.filter(en_service=True)
+        ['M107302001']
+        """
+        codes = [str(c) for c in codes]
+
+        # hash index of codes (keeping first occurrence of duplicates)
+        self._index = {}
+        for i, code in enumerate(codes):
+            self._index.setdefault(code, i)
+        keep = np.fromiter(self._index.values(), dtype=np.int64)
+
+        self._codes = np.asarray(codes, dtype=object)[keep]
+
+        def _column(values, kind):
+            if values is None:
+                values = [None] * len(codes)
+            values = np.asarray(values, dtype=object)[keep]
+            if kind == 'category':
+                return pd.Categorical(values)
+            elif kind == 'boolean':
+                return pd.array(values.tolist(), dtype='boolean')
+            else:
+                return pd.to_numeric(values, errors='coerce').astype('float32')
+
+        self._departement = _column(departement, 'category')
+        self._milieu = _column(milieu, 'category')
+        self._en_service = _column(en_service, 'boolean')
+        self._longitude = _column(longitude, 'float')
+        self._latitude = _column(latitude, 'float')
+
+        # re-index to contiguous positions
+        self._index = {code: i for i, code in enumerate(self._codes)}
+
+    def __getitem__(self, code: str) -> dict:
+        try:
+            i = self._index[code]
+        except KeyError:
+            raise KeyError(
+                f"{repr(code)} is not a registered station"
+            )
+
+        departement, milieu = self._departement[i], self._milieu[i]
+
+        return {
+            'departement': None if pd.isna(departement) else departement,
+            'milieu': None if pd.isna(milieu) else milieu,
+            'en_service': (
+                None if pd.isna(self._en_service[i])
+                else bool(self._en_service[i])
+            ),
+            'longitude': float(self._longitude[i]),
+            'latitude': float(self._latitude[i])
+        }
+
+    def __contains__(self, code) -> bool:
+        return code in self._index
+
+    def __iter__(self):
+        return iter(self._codes)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __repr__(self) -> str:
+        return f"StationRegistry({len(self)} stations)"
+
+    def _mask(
+            self, departement: str | list = None, milieu: str | list = None,
+            en_service: bool = None
+    ) -> np.ndarray:
+        mask = np.ones(len(self), dtype=bool)
+
+        if departement is not None:
+            mask &= np.isin(
+                np.asarray(self._departement, dtype=object),
+                np.atleast_1d(departement).astype(object)
+            )
+        if milieu is not None:
+            mask &= np.isin(
+                np.asarray(self._milieu, dtype=object),
+                np.atleast_1d(milieu).astype(object)
+            )
+        if en_service is not None:
+            mask &= (
+                self._en_service.fillna(not en_service).to_numpy(dtype=bool)
+                == en_service
+            )
+
+        return mask
+
+    def _matches(
+            self, code: str, departement: str | list = None,
+            milieu: str | list = None, en_service: bool = None
+    ) -> bool:
+        i = self._index[code]
+
+        if departement is not None:
+            if self._departement[i] not in np.atleast_1d(departement):
+                return False
+        if milieu is not None:
+            if self._milieu[i] not in np.atleast_1d(milieu):
+                return False
+        if en_service is not None:
+            if pd.isna(self._en_service[i]):
+                return False
+            if bool(self._en_service[i]) is not en_service:
+                return False
+
+        return True
+
+    def filter(
+            self, departement: str | list = None, milieu: str | list = None,
+            en_service: bool = None
+    ) -> list:
+        """Select the codes of the stations matching all given criteria.
+
+        :Parameters:
+
+            departement: `str` or `list`, optional
+                The departement code(s) the stations must belong to.
+
+            milieu: `str` or `list`, optional
+                The type(s) of environment the stations must be in.
+
+            en_service: `bool`, optional
+                Whether the stations must be in operation or not.
+
+        :Returns:
+
+            `list`
+                The codes of the matching stations.
+        """
+        return self._codes[
+            self._mask(departement, milieu, en_service)
+        ].tolist()
+
+    def missing(self, codes: list, **criteria) -> list:
+        """Identify amongst the given codes those that are not registered
+        or that do not match the given criteria (see `filter`).
+
+        :Parameters:
+
+            codes: `list`
+                The codes of the stations to check.
+
+        :Returns:
+
+            `list`
+                The codes of the stations that are not registered or
+                that do not match the criteria.
+        """
+        if not criteria:
+            return [c for c in codes if c not in self._index]
+
+        return [
+            c for c in codes
+            if (c not in self._index) or (not self._matches(c, **criteria))
+        ]
+
+    def to_dict(self) -> dict:
+        return {
+            'codes': self._codes.tolist(),
+            'departement': [
+                None if pd.isna(v) else v for v in self._departement
+            ],
+            'milieu': [
+                None if pd.isna(v) else v for v in self._milieu
+            ],
+            'en_service': [
+                None if pd.isna(v) else bool(v) for v in self._en_service
+            ],
+            'longitude': [
+                None if np.isnan(v) else float(v) for v in self._longitude
+            ],
+            'latitude': [
+                None if np.isnan(v) else float(v) for v in self._latitude
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, content: dict) -> 'StationRegistry':
+        return cls(**content)
+
+    @classmethod
+    def from_dataframe(
+            cls, df: pd.DataFrame | None, code_field: str,
+            fields: dict = None
+    ) -> 'StationRegistry':
+        if df is None:
+            return cls([])
+
+        fields = fields if fields else {}
+
+        return cls(
+            codes=df[code_field].values,
+            **{
+                name: df[field].values
+                for name, field in fields.items()
+                if field in df.columns
+            }
+        )
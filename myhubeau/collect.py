@@ -1,6 +1,21 @@
-import requests
+import time
+from typing import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
+from requests.exceptions import RequestException
+
+from ._client import (
+    _get, configure_client, get_connection_stats, get_retry_stats
+)
+from ._decode import (
+    _decode_pages, _accumulate_daily_pages, _aggregate_daily
+)
+from ._merge import _get_index, _merge_series, _merge_many
+from ._cache import (
+    _load_referential, _load_raw, configure_cache, clear_cache
+)
+from ._registry import StationRegistry
 
 
 # "global" (module-wide) variables for memoization
@@ -8,45 +23,160 @@ _hydrometry_stations = None
 _piezometry_stations = None
 _withdrawal_stations = None
 
+# departements to sweep through for referentials limited in query size
+_departements = (
+    [f'{i:02}' for i in range(1, 96) if i != 20]
+    + ['2A', '2B', '971', '972', '973', '974', '976']
+)
 
-def _get_json_data(url: str, data: list) -> list:
-    r = requests.get(url)
+# "global" (module-wide) variables for departement sweep settings
+_sweep_settings = {
+    'max_workers': 8,
+    # (requests are already retried by the HTTP client, so a departement
+    # query is only tried again once in case it fails part way through)
+    'retries': 1,
+    'backoff': 1.
+}
 
-    if r.status_code == 200:
-        data.extend(r.json()['data'])
-        return data
-    elif r.status_code == 206:
-        data.extend(r.json()['data'])
-        if r.json()['next']:
-            return _get_json_data(r.json()['next'], data)
+# maximum number of results Hub'Eau lets a query page through
+_max_query_results = 20000
+
+# maximum number of station codes listed in one query (to keep URLs short)
+_max_query_codes = 200
+
+# headers for withdrawal data depending on type of environment
+_withdrawal_measure_labels = {
+    'CONT': 'Prelevement continental',
+    'SOUT': 'Prelevement souterrain'
+}
+
+
+class _QueryTooLarge(Exception):
+    def __init__(self, count: int):
+        super().__init__(f"query would return {count} records")
+        self.count = count
+
+
+def _iter_json_pages(url: str, max_results: int = None) -> Iterator[list]:
+    # follow pagination iteratively, yielding one page of records at a time
+    while url:
+        r = _get(url)
+
+        if r.status_code not in (200, 206):
+            raise RuntimeError(
+                f"data retrieval failed for query with URL {url}"
+            )
+
+        # parse response body only once
+        content = r.json()
+
+        # give up as soon as total count shows query cannot be paged
+        # through entirely
+        if (max_results is not None) and (
+                content.get('count', 0) > max_results
+        ):
+            raise _QueryTooLarge(content['count'])
+
+        yield content['data']
+
+        if r.status_code == 200:
+            url = None
         else:
             # catch edge case (bug?) where return code is 206 (i.e.
             # remaining data to be fetched) but next URL is None (e.g.
             # this is the case for https://hubeau.eaufrance.fr/api/
             # v1/prelevements/referentiel/points_prelevement?
             # code_departement=40&page=2&size=10000)
-            return data
-    else:
-        raise RuntimeError(
-            f"data retrieval failed for query with URL {url}"
-        )
+            url = content.get('next')
 
 
-def _get_dataframe(
-        endpoint: str, operation: str, parameters: dict
-) -> pd.DataFrame | None:
-    url = (
+def _build_url(endpoint: str, operation: str, parameters: dict) -> str:
+    return (
         f"https://hubeau.eaufrance.fr/api/{endpoint}/{operation}?"
         f"{'&'.join(['='.join([k, str(v)]) for k, v in parameters.items()])}"
     )
 
-    data = _get_json_data(url, [])
 
-    if data:
-        return pd.concat(
-            [pd.DataFrame.from_dict(i, orient='index') for i in data],
-            axis=1
-        ).T
+def _iter_pages(
+        endpoint: str, operation: str, parameters: dict,
+        max_results: int = None
+) -> Iterator[list]:
+    return _iter_json_pages(
+        _build_url(endpoint, operation, parameters), max_results
+    )
+
+
+def _get_dataframe(
+        endpoint: str, operation: str, parameters: dict,
+        dtypes: dict = None, date_formats: dict = None,
+        max_results: int = None
+) -> pd.DataFrame | None:
+    # decode pages into typed columns as pages arrive
+    return _decode_pages(
+        _iter_pages(endpoint, operation, parameters, max_results),
+        fields=(
+            parameters['fields'].split(',') if 'fields' in parameters
+            else None
+        ),
+        dtypes=dtypes, date_formats=date_formats
+    )
+
+
+def _get_query_key(endpoint: str, operation: str, parameters: dict) -> tuple:
+    return (
+        endpoint, operation,
+        tuple(sorted((key, str(value)) for key, value in parameters.items()))
+    )
+
+
+def _get_period_parameters(
+        start_field: str, end_field: str,
+        start: str = None, end: str = None, date_format: str = '%Y-%m-%d'
+) -> dict:
+    parameters = {}
+
+    if start:
+        parameters[start_field] = pd.Timestamp(start).strftime(date_format)
+    if end:
+        end = pd.Timestamp(end)
+        # include entire last day for sub-daily data
+        if '%H' in date_format:
+            end += pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+        parameters[end_field] = end.strftime(date_format)
+
+    return parameters
+
+
+def _split_by_station(data: pd.DataFrame | None, split_field: str) -> dict:
+    if data is None:
+        return {}
+
+    return {
+        code: group.drop(columns=split_field)
+        for code, group in data.groupby(split_field, sort=False)
+    }
+
+
+def _process_consolidated_dataframe(
+        data: pd.DataFrame,
+        date_field: str, date_label: str,
+        measure_field: str, measure_label: str,
+        quality_field: str, good_quality_values: list
+) -> pd.DataFrame:
+    # make sure data is in chronological order
+    data = data.sort_values(by=date_field)
+
+    # check consolidated data quality
+    data.loc[
+        ~np.isin(np.asarray(data[quality_field]), good_quality_values),
+        measure_field
+    ] = np.nan
+    data = data.drop(columns=quality_field)
+
+    # rename headers
+    data.columns = [date_label, measure_label]
+
+    return data
 
 
 def _get_consolidated_dataframe(
@@ -55,19 +185,36 @@ def _get_consolidated_dataframe(
         date_field: str, date_format: str, date_label: str,
         measure_field: str, measure_label: str,
         quality_field: str, good_quality_values: list,
-        extra_parameters: dict = None
-) -> pd.DataFrame | None:
+        extra_parameters: dict = None, split_field: str = None,
+        max_results: int = None
+) -> pd.DataFrame | dict | None:
+    parameters = {
+        station_field: station_code,
+        'fields': ','.join(
+            ([split_field] if split_field else [])
+            + [date_field, measure_field, quality_field]
+        ),
+        'size': 10000
+    } | (extra_parameters if extra_parameters else {})
+
     try:
-        data = _get_dataframe(
-            endpoint=api_endpoint,
-            operation=api_operation,
-            parameters={
-                station_field: station_code,
-                'fields': ','.join(
-                    [date_field, measure_field, quality_field]
-                ),
-                'size': 10000
-            } | (extra_parameters if extra_parameters else {})
+        # raw observations (with quality codes) are cached so that other
+        # quality filters can be applied without querying Hub'Eau again
+        data = _load_raw(
+            _get_query_key(api_endpoint, api_operation, parameters),
+            lambda: _get_dataframe(
+                endpoint=api_endpoint,
+                operation=api_operation,
+                parameters=parameters,
+                dtypes={
+                    measure_field: 'float64',
+                    # small integer codes (e.g. hydrometry), falling back
+                    # on categorical labels (e.g. piezometry, withdrawal)
+                    quality_field: 'int8'
+                },
+                date_formats={date_field: date_format},
+                max_results=max_results
+            )
         )
     except RuntimeError as e:
         raise RuntimeError(
@@ -75,24 +222,21 @@ def _get_consolidated_dataframe(
             f"failed for {station_code}"
         ) from e
 
-    if data is not None:
-        # make sure data is in chronological order
-        data = data.sort_values(by=date_field)
-
-        # check consolidated data quality
-        data[measure_field][
-            ~np.isin(data[quality_field].values, good_quality_values)
-        ] = np.nan
-        data = data.drop(columns=quality_field)
-
-        # convert to datetime
-        data[date_field] = pd.to_datetime(
-            data[date_field], format=date_format
-        )
-        # rename headers
-        data.columns = [date_label, measure_label]
+    processing = dict(
+        date_field=date_field, date_label=date_label,
+        measure_field=measure_field, measure_label=measure_label,
+        quality_field=quality_field, good_quality_values=good_quality_values
+    )
 
-        return data
+    # split multi-station query into one dataframe per station
+    if split_field:
+        return {
+            code: _process_consolidated_dataframe(group, **processing)
+            for code, group in _split_by_station(data, split_field).items()
+        }
+
+    if data is not None:
+        return _process_consolidated_dataframe(data, **processing)
 
 
 def _get_realtime_dataframe(
@@ -101,19 +245,32 @@ def _get_realtime_dataframe(
         date_field: str, date_format: str, date_label: str,
         measure_field: str, measure_label: str,
         aggregation_method: str = 'mean',
-        extra_parameters: dict = None
-) -> pd.DataFrame | None:
+        extra_parameters: dict = None, split_field: str = None,
+        max_results: int = None
+) -> pd.DataFrame | dict | None:
+    parameters = {
+        station_field: station_code,
+        'fields': ','.join(
+            ([split_field] if split_field else [])
+            + [date_field, measure_field]
+        ),
+        'size': 10000
+    } | (extra_parameters if extra_parameters else {})
+
     try:
-        data = _get_dataframe(
-            endpoint=api_endpoint,
-            operation=api_operation,
-            parameters={
-                station_field: station_code,
-                'fields': ','.join(
-                    [date_field, measure_field]
+        # fold pages into daily accumulators as they arrive so that raw
+        # high-frequency readings are never all held in memory (and
+        # cache accumulators so that other aggregation methods can be
+        # applied without querying Hub'Eau again)
+        accumulators = _load_raw(
+            _get_query_key(api_endpoint, api_operation, parameters),
+            lambda: _accumulate_daily_pages(
+                _iter_pages(
+                    api_endpoint, api_operation, parameters, max_results
                 ),
-                'size': 10000
-            } | (extra_parameters if extra_parameters else {})
+                date_field=date_field, date_format=date_format,
+                measure_field=measure_field, split_field=split_field
+            )
         )
     except RuntimeError as e:
         raise RuntimeError(
@@ -121,96 +278,354 @@ def _get_realtime_dataframe(
             f"failed for {station_code}"
         ) from e
 
-    if data is not None:
-        # make sure data is in chronological order
-        data = data.sort_values(by=date_field)
-        
-        # aggregate real-time data to mean daily values
-        data[date_field] = pd.to_datetime(
-            data[date_field], format=date_format
+    dfs = {}
+    for code, daily in accumulators.items():
+        series = _aggregate_daily(daily, aggregation_method)
+        dfs[code] = pd.DataFrame(
+            {date_label: series.index.values, measure_label: series.values}
         )
-        data = data.set_index(date_field)
-        data = data.resample('D').agg(aggregation_method)
-        data = data.reset_index()
 
-        # rename headers
-        data.columns = [date_label, measure_label]
+    # return one dataframe per station for multi-station query
+    if split_field:
+        return dfs
+
+    return next(iter(dfs.values()), None)
+
+
+def _get_within_query_limit(
+        get: Callable, parameters: dict
+) -> pd.DataFrame | dict | None:
+    codes = parameters['station_code'].split(',')
+
+    # single-station queries are sent as they are
+    if not (parameters.get('split_field') and (len(codes) > 1)):
+        return get(**parameters)
+
+    try:
+        return get(**parameters, max_results=_max_query_results)
+    except _QueryTooLarge as e:
+        # only group as many stations as fit in one query (based on the
+        # average number of records per station in the batch, queries
+        # still too large being split again)
+        size = max(1, int(_max_query_results // (e.count / len(codes))))
+        if size >= len(codes):
+            size = len(codes) // 2
+
+        return {
+            code: frame
+            for batch in _iter_batches(codes, size)
+            for code, frame in _get_within_query_limit(
+                get, parameters | {'station_code': ','.join(batch)}
+            ).items()
+        }
 
-        return data
+
+def _get_batch_size(
+        batch_size: int, start: str = None, end: str = None
+) -> int:
+    # only group as many stations as their daily records over the period
+    # fit in one query (record length is unknown without a start date)
+    if start is None:
+        return batch_size
+
+    end = pd.Timestamp(end) if end else pd.Timestamp.today().normalize()
+    days = max((end - pd.Timestamp(start)).days + 1, 1)
+
+    return max(1, min(batch_size, _max_query_results // days))
+
+
+def _get_consolidated_and_realtime_dataframes(
+        consolidated_parameters: dict, realtime_parameters: dict = None
+) -> tuple:
+    # issue consolidated and real-time queries concurrently (since they
+    # are independent) so that only the slower of the two is waited for
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        future_cons = executor.submit(
+            _get_within_query_limit,
+            _get_consolidated_dataframe, consolidated_parameters
+        )
+        future_tr = (
+            executor.submit(
+                _get_within_query_limit,
+                _get_realtime_dataframe, realtime_parameters
+            )
+            if realtime_parameters is not None else None
+        )
+
+        data_cons = future_cons.result()
+        data_tr = future_tr.result() if future_tr is not None else None
+
+    return data_cons, data_tr
+
+
+def _get_sources(frames: list, date_label: str, measure_label: str) -> list:
+    # extract (dates, values) arrays from frames (skipping missing ones)
+    return [
+        (
+            frame[date_label].values,
+            frame[measure_label].to_numpy(dtype='float64', na_value=np.nan)
+        )
+        for frame in frames if frame is not None
+    ]
 
 
 def _merge_consolidated_and_realtime_dataframe(
         data_cons: (pd.DataFrame | None), data_tr: (pd.DataFrame | None),
-        date_label: str, measure_label: str, date_freq: str = 'D'
+        date_label: str, measure_label: str, date_freq: str = 'D',
+        dtype: str = 'float64'
 ) -> pd.DataFrame | None:
-    if (data_cons is not None) or (data_tr is not None):
-        # merge along dates
-        data = pd.merge(
-            left=(
-                data_cons if data_cons is not None
-                else pd.DataFrame(columns=[date_label, measure_label])
-            ),
-            right=(
-                data_tr if data_tr is not None
-                else pd.DataFrame(columns=[date_label, measure_label])
-            ),
-            on=date_label, how='outer', suffixes=('_cons', '_tr')
+    # deal with overlap by filling real-time data first and consolidated
+    # data second (favour consolidated)
+    # (could use dates as filter rather than NaN because, towards the end
+    # of the time series, real-time data are included in consolidated
+    # data before being given a quality value but there is no reason to
+    # include real-time data (without quality value) and not to include
+    # consolidated data without quality value)
+    sources = _get_sources([data_tr, data_cons], date_label, measure_label)
+
+    # pre-allocate index filling in potentially missing dates
+    index = _get_index([dates for dates, _ in sources], freq=date_freq)
+    if index is None:
+        return None
+
+    return pd.DataFrame(
+        {
+            date_label: index,
+            measure_label: _merge_series(index, sources, dtype)
+        }
+    )
+
+
+def _iter_batches(codes: list, batch_size: int) -> Iterator[list]:
+    for i in range(0, len(codes), batch_size):
+        yield codes[i:i + batch_size]
+
+
+def _format_many(
+        frames: dict, date_label: str, measure_label: str, output: str
+) -> dict | pd.DataFrame | None:
+    if output == 'dict':
+        return frames
+
+    available = {
+        code: frame for code, frame in frames.items() if frame is not None
+    }
+    if not available:
+        return None
+
+    if output == 'long':
+        # stack stations on top of one another
+        data = pd.concat(
+            [
+                frame.assign(Station=code)[
+                    ['Station', date_label, measure_label]
+                ]
+                for code, frame in available.items()
+            ],
+            ignore_index=True
         )
+        # store each station code once rather than once per time step
+        data['Station'] = pd.Categorical(data['Station'], list(available))
+
+        return data
+    elif output == 'wide':
+        # align stations side by side along a shared daily index
+        sources = [
+            _get_sources([frame], date_label, measure_label)
+            for frame in available.values()
+        ]
+        index = _get_index([s[0][0] for s in sources])
 
-        # deal with overlap (favour consolidated)
-        data[measure_label] = np.where(
-            # could use dates as filter rather than NaN because, towards
-            # the end of the time series, real-time data are included in
-            # consolidated data before being given a quality value but
-            # there is no reason to include real-time data (without
-            # quality value) and not to include consolidated data
-            # without quality value
-            data[f'{measure_label}_cons'].isna(),
-            data[f'{measure_label}_tr'], data[f'{measure_label}_cons']
+        dtype = np.result_type(
+            *[frame[measure_label].dtype for frame in available.values()]
         )
 
-        # fill in potentially missing dates
-        idx = pd.date_range(
-            data[date_label].iloc[0], data[date_label].iloc[-1],
-            freq=date_freq
+        return pd.DataFrame(
+            _merge_many(index, sources, dtype),
+            index=index, columns=list(available)
+        ).reset_index(names=date_label)
+    else:
+        raise ValueError(
+            f"output {repr(output)} is not valid, "
+            f"it must be one of 'dict', 'long', 'wide'"
         )
-        data = data.set_index(date_label)
-        data = data.reindex(idx, fill_value=np.nan)
-        data = data.reset_index(names=date_label)
 
-        return data.drop(
-            columns=[f'{measure_label}_cons', f'{measure_label}_tr']
+
+def _get_departement_dataframe(
+        endpoint: str, operation: str, parameters: dict, departement: str
+) -> pd.DataFrame | None:
+    for attempt in range(_sweep_settings['retries'] + 1):
+        try:
+            return _get_dataframe(
+                endpoint=endpoint,
+                operation=operation,
+                parameters=parameters | {'code_departement': departement}
+            )
+        except (RuntimeError, RequestException) as e:
+            if attempt == _sweep_settings['retries']:
+                raise RuntimeError(
+                    f"data retrieval failed for departement {departement} "
+                    f"after {attempt + 1} attempts"
+                ) from e
+            # wait a little longer after each failed attempt
+            time.sleep(_sweep_settings['backoff'] * (attempt + 1))
+
+
+def _sweep_departements(
+        endpoint: str, operation: str, parameters: dict
+) -> pd.DataFrame | None:
+    # (loop through departements to bypass 20000 query size limit,
+    # querying several departements at once and retrying each on failure)
+    with ThreadPoolExecutor(
+            max_workers=_sweep_settings['max_workers']
+    ) as executor:
+        frames = list(
+            executor.map(
+                lambda departement: _get_departement_dataframe(
+                    endpoint, operation, parameters, departement
+                ),
+                _departements
+            )
         )
 
+    # concatenate all departements at once
+    frames = [frame for frame in frames if frame is not None]
+    if frames:
+        return pd.concat(frames, ignore_index=True)
 
-def _set_and_get_hydrometry_stations() -> list:
-    global _hydrometry_stations
 
-    # set list of available stations still in operation
+def configure_sweep(
+        max_workers: int = None, retries: int = None, backoff: float = None
+) -> None:
+    """Configure the departement-by-departement sweep used to collect
+    the piezometry and withdrawal referentials from Hub'Eau.
+
+    :Parameters:
+
+        max_workers: `int`, optional
+            The maximum number of departements queried concurrently. If
+            not provided, the current value is kept (default value is
+            `8`).
+
+        retries: `int`, optional
+            The number of times the query for a given departement is
+            tried again if it fails (on top of the retries of each
+            request, see `configure_client`). If not provided, the
+            current value is kept (default value is `1`).
+
+        backoff: `float`, optional
+            The delay (in seconds) before the first retry, multiplied by
+            the attempt number for subsequent retries. If not provided,
+            the current value is kept (default value is `1`).
+
+    :Returns:
+
+        `None`
+
+    **Examples**
+
+    Querying up to four departements at a time:
+
+    >>> configure_sweep(max_workers=4)
+    """
+    for key, value in (
+            ('max_workers', max_workers),
+            ('retries', retries),
+            ('backoff', backoff)
+    ):
+        if value is not None:
+            _sweep_settings[key] = value
+
+
+def _fetch_hydrometry_stations() -> dict:
+    # set registry of available stations (with operation status)
     hydrometry_stations = _get_dataframe(
         endpoint="v1/hydrometrie",
         operation="referentiel/stations",
         parameters={
-            'fields': 'code_station',
-            'en_service': 'true',
+            'fields': ','.join(
+                ['code_station', 'code_departement', 'en_service',
+                 'longitude_station', 'latitude_station']
+            ),
             'size': 10000
         }
     )
 
-    # check whether at least one station exists
-    if hydrometry_stations is not None:
-        _hydrometry_stations = (
-            hydrometry_stations['code_station'].values.tolist()
+    return StationRegistry.from_dataframe(
+        hydrometry_stations, 'code_station',
+        {
+            'departement': 'code_departement',
+            'en_service': 'en_service',
+            'longitude': 'longitude_station',
+            'latitude': 'latitude_station'
+        }
+    ).to_dict()
+
+
+def _set_and_get_hydrometry_stations(
+        refresh: bool = False
+) -> StationRegistry:
+    global _hydrometry_stations
+
+    # load from on-disk cache (if fresh) or from Hub'Eau
+    _hydrometry_stations = StationRegistry.from_dict(
+        _load_referential(
+            'hydrometry', _fetch_hydrometry_stations, refresh
         )
-    else:
-        _hydrometry_stations = []
+    )
 
     return _hydrometry_stations
 
 
+def _get_hydrometry_queries(
+        code_station: str, date_label: str, measure_label: str,
+        include_realtime: bool, keep_quality_values: list = None,
+        split_field: str = None, start: str = None, end: str = None
+) -> tuple:
+    consolidated_parameters = dict(
+        api_kind='hydrometry', api_endpoint='v1/hydrometrie',
+        api_operation='obs_elab',
+        station_field='code_entite', station_code=code_station,
+        date_field='date_obs_elab', date_format='%Y-%m-%d',
+        date_label=date_label,
+        measure_field='resultat_obs_elab', measure_label=measure_label,
+        quality_field='code_qualification',
+        good_quality_values=(
+            keep_quality_values if keep_quality_values else [16, 20]
+        ),
+        extra_parameters=(
+            {'grandeur_hydro_elab': 'QmJ'}
+            | _get_period_parameters(
+                'date_debut_obs_elab', 'date_fin_obs_elab', start, end
+            )
+        ),
+        split_field=split_field
+    )
+
+    realtime_parameters = dict(
+        api_kind='hydrometry', api_endpoint='v1/hydrometrie',
+        api_operation='observations_tr',
+        station_field='code_entite', station_code=code_station,
+        date_field='date_obs', date_format='%Y-%m-%dT%H:%M:%SZ',
+        date_label=date_label,
+        measure_field='resultat_obs', measure_label=measure_label,
+        extra_parameters=(
+            {'grandeur_hydro': 'Q'}
+            | _get_period_parameters(
+                'date_debut_obs', 'date_fin_obs', start, end,
+                date_format='%Y-%m-%dT%H:%M:%SZ'
+            )
+        ),
+        split_field=split_field
+    ) if include_realtime else None
+
+    return consolidated_parameters, realtime_parameters
+
+
 def get_hydrometry(
         code_station: str, include_realtime: bool = True,
-        keep_quality_values: list = None
+        keep_quality_values: list = None,
+        start: str = None, end: str = None, dtype: str = 'float64'
 ) -> pd.DataFrame | None:
     """Collect entire record of observed hydrometric data for a given
     station (in cubic metres per second) from HydroPortail via Hub'Eau.
@@ -232,6 +647,27 @@ def get_hydrometry(
             `16` ("correct"), and `20` ("good"). If not provided, quality
             values `16` and `20` are kept.
 
+        start: `str`, optional
+            The earliest date for which data is requested from Hub'Eau
+            (the period is filtered by Hub'Eau before data is sent). The
+            date must be specified in a string following the ISO
+            8601-1:2019 standard, i.e. “YYYY-MM-DD” (e.g. the 21st of May
+            2007 is “2007-05-21”). If not provided, data is collected from
+            the start of the record.
+
+        end: `str`, optional
+            The latest date for which data is requested from Hub'Eau
+            (the period is filtered by Hub'Eau before data is sent). The
+            date must be specified in a string following the ISO
+            8601-1:2019 standard, i.e. “YYYY-MM-DD” (e.g. the 21st of May
+            2007 is “2007-05-21”). If not provided, data is collected up
+            to the end of the record.
+
+        dtype: `str`, optional
+            The data type of the measures in the output (e.g. `'float32'`
+            to halve the memory footprint of the time series). If not
+            provided, set to default value `'float64'`.
+
     :Returns:
 
         `pandas.DataFrame` or `None`
@@ -260,7 +696,7 @@ def get_hydrometry(
     )
 
     # check code station is available
-    if code_station not in hydrometry_stations:
+    if hydrometry_stations.missing([code_station], en_service=True):
         raise ValueError(
             f"code station {repr(code_station)} is not "
             f"available in Hub'Eau hydrometry API or "
@@ -271,83 +707,237 @@ def get_hydrometry(
     date_label = 'Date'
     measure_label = 'Debit'
 
-    # get elaborated data
-    data_cons = _get_consolidated_dataframe(
-        api_kind='hydrometry', api_endpoint='v1/hydrometrie',
-        api_operation='obs_elab',
-        station_field='code_entite', station_code=code_station,
-        date_field='date_obs_elab', date_format='%Y-%m-%d',
-        date_label=date_label,
-        measure_field='resultat_obs_elab', measure_label=measure_label,
-        quality_field='code_qualification',
-        good_quality_values=(
-            keep_quality_values if keep_quality_values else [16, 20]
-        ),
-        extra_parameters={'grandeur_hydro_elab': 'QmJ'}
-    )
-
-    data_tr = None
-    if include_realtime:
-        # get real time data
-        data_tr = _get_realtime_dataframe(
-            api_kind='hydrometry', api_endpoint='v1/hydrometrie',
-            api_operation='observations_tr',
-            station_field='code_entite', station_code=code_station,
-            date_field='date_obs', date_format='%Y-%m-%dT%H:%M:%SZ',
-            date_label=date_label,
-            measure_field='resultat_obs', measure_label=measure_label,
-            extra_parameters={'grandeur_hydro': 'Q'}
+    # get elaborated data and real-time data (if requested) concurrently
+    data_cons, data_tr = _get_consolidated_and_realtime_dataframes(
+        *_get_hydrometry_queries(
+            code_station, date_label, measure_label,
+            include_realtime, keep_quality_values, start=start, end=end
         )
+    )
 
     # potentially aggregate elaborated and real-time data
     data_all = _merge_consolidated_and_realtime_dataframe(
-        data_cons, data_tr, date_label, measure_label
+        data_cons, data_tr, date_label, measure_label, dtype=dtype
     )
 
-    # convert [L.s-1] into [m3.s-1]
-    data_all[measure_label] /= 1000
+    if data_all is not None:
+        # convert [L.s-1] into [m3.s-1]
+        data_all[measure_label] /= 1000
 
     return data_all
 
 
-# get list of available stations still on operation
-def _set_and_get_piezometry_stations() -> list:
-    global _piezometry_stations
+def get_hydrometry_many(
+        codes_station: list, include_realtime: bool = True,
+        keep_quality_values: list = None,
+        start: str = None, end: str = None, dtype: str = 'float64',
+        batch_size: int = 20, output: str = 'dict'
+) -> dict | pd.DataFrame | None:
+    """Collect entire record of observed hydrometric data for several
+    stations (in cubic metres per second) from HydroPortail via Hub'Eau,
+    grouping stations into multi-station queries.
+
+    :Parameters:
+
+        codes_station: `list`
+            The codes of the hydrometric stations for which streamflow
+            data is requested from HydroPortail via Hub'Eau.
+
+        include_realtime: `bool`, optional
+            Whether to include real-time data (if available) and
+            aggregate it with consolidated data. If not provided,
+            set to default value `True`.
+
+        keep_quality_values: `bool`, optional
+            The list of quality values in the field *code_qualification*
+            where to keep the time steps. Relevant values are `12` ("dubious"),
+            `16` ("correct"), and `20` ("good"). If not provided, quality
+            values `16` and `20` are kept.
+
+        start: `str`, optional
+            The earliest date for which data is requested from Hub'Eau
+            (the period is filtered by Hub'Eau before data is sent). The
+            date must be specified in a string following the ISO
+            8601-1:2019 standard, i.e. “YYYY-MM-DD” (e.g. the 21st of May
+            2007 is “2007-05-21”). If not provided, data is collected from
+            the start of the record.
+
+        end: `str`, optional
+            The latest date for which data is requested from Hub'Eau
+            (the period is filtered by Hub'Eau before data is sent). The
+            date must be specified in a string following the ISO
+            8601-1:2019 standard, i.e. “YYYY-MM-DD” (e.g. the 21st of May
+            2007 is “2007-05-21”). If not provided, data is collected up
+            to the end of the record.
+
+        dtype: `str`, optional
+            The data type of the measures in the output (e.g. `'float32'`
+            to halve the memory footprint of the time series). If not
+            provided, set to default value `'float64'`.
+
+        batch_size: `int`, optional
+            The maximum number of stations to group in a single query.
+            Fewer stations are grouped if their records would exceed the
+            20000 records Hub'Eau lets a query page through (based on
+            the period requested, or else on the total count returned
+            with the first page). If not provided, set to default value
+            `20`.
+
+        output: `str`, optional
+            The format of the output, either `'dict'` (one dataframe per
+            station), `'long'` (one dataframe with three columns *Station*,
+            *Date*, and *Debit*), or `'wide'` (one dataframe with a column
+            *Date* and one column per station). If not provided, set to
+            default value `'dict'`.
+
+    :Returns:
+
+        `dict` or `pandas.DataFrame` or `None`
+            The dictionary containing the streamflow time series for each
+            station (`None` for stations without data on Hub'Eau), or the
+            dataframe gathering all stations (`None` if no data is
+            available for any station).
+
+    **Examples**
+
+    Collecting consolidated and real-time streamflow data for two
+    hydrometric stations:
 
-    # (loop through departements to bypass 20000 query size limit)
-    piezometry_stations = None
-    for departement in (
-            [f'{i:02}' for i in range(1, 96) if i != 20]
-            + ['2A', '2B', '971', '972', '973', '974', '976']
+    >>> get_hydrometry_many(
+    ...     codes_station=['M107302001', 'M108201001'], output='wide'
+    ... )  # doctest: +SKIP
+    """
+    # collect list of hydrometric stations (if not already collected)
+    hydrometry_stations = (
+        _hydrometry_stations if _hydrometry_stations is not None
+        else _set_and_get_hydrometry_stations()
+    )
+
+    # check code stations are available
+    unavailable = hydrometry_stations.missing(codes_station, en_service=True)
+    if unavailable:
+        raise ValueError(
+            f"code stations {repr(unavailable)} are not "
+            f"available in Hub'Eau hydrometry API or "
+            f"are not in operation anymore"
+        )
+
+    # set headers for output dataframes
+    date_label = 'Date'
+    measure_label = 'Debit'
+
+    frames = {}
+    for batch in _iter_batches(
+            list(dict.fromkeys(codes_station)),
+            _get_batch_size(batch_size, start, end)
     ):
-        piezometry_stations = pd.concat(
-            [
-                piezometry_stations, _get_dataframe(
-                    endpoint="v1/niveaux_nappes",
-                    operation="stations",
-                    parameters={
-                        'fields': 'code_bss',
-                        'code_departement': departement,
-                        'size': 10000
-                    }
-                )
-            ]
+        # get elaborated data and real-time data (if requested)
+        # concurrently for all stations in batch
+        data_cons, data_tr = _get_consolidated_and_realtime_dataframes(
+            *_get_hydrometry_queries(
+                ','.join(batch), date_label, measure_label,
+                include_realtime, keep_quality_values,
+                split_field='code_station', start=start, end=end
+            )
         )
+        data_tr = data_tr if data_tr is not None else {}
+
+        for code in batch:
+            # potentially aggregate elaborated and real-time data
+            data_all = _merge_consolidated_and_realtime_dataframe(
+                data_cons.get(code), data_tr.get(code),
+                date_label, measure_label, dtype=dtype
+            )
+
+            if data_all is not None:
+                # convert [L.s-1] into [m3.s-1]
+                data_all[measure_label] /= 1000
 
-    # check whether at least one station exists
-    if piezometry_stations is not None:
-        _piezometry_stations = (
-            piezometry_stations['code_bss'].values.tolist()
+            frames[code] = data_all
+
+    return _format_many(frames, date_label, measure_label, output)
+
+
+def _fetch_piezometry_stations() -> dict:
+    piezometry_stations = _sweep_departements(
+        endpoint="v1/niveaux_nappes",
+        operation="stations",
+        parameters={
+            'fields': 'code_bss,code_departement,x,y',
+            'size': 10000
+        }
+    )
+
+    return StationRegistry.from_dataframe(
+        piezometry_stations, 'code_bss',
+        {
+            'departement': 'code_departement',
+            'longitude': 'x',
+            'latitude': 'y'
+        }
+    ).to_dict()
+
+
+# get registry of available stations
+def _set_and_get_piezometry_stations(
+        refresh: bool = False
+) -> StationRegistry:
+    global _piezometry_stations
+
+    # load from on-disk cache (if fresh) or from Hub'Eau
+    _piezometry_stations = StationRegistry.from_dict(
+        _load_referential(
+            'piezometry', _fetch_piezometry_stations, refresh
         )
-    else:
-        _piezometry_stations = []
+    )
 
     return _piezometry_stations
 
 
+def _get_piezometry_queries(
+        code_bss: str, date_label: str, measure_label: str,
+        include_realtime: bool, keep_quality_values: list = None,
+        split_field: str = None, start: str = None, end: str = None
+) -> tuple:
+    consolidated_parameters = dict(
+        api_kind='piezometry', api_endpoint='v1/niveaux_nappes',
+        api_operation='chroniques',
+        station_field='code_bss', station_code=code_bss,
+        date_field='date_mesure', date_format='%Y-%m-%d',
+        date_label=date_label,
+        measure_field='niveau_nappe_eau', measure_label=measure_label,
+        quality_field='qualification',
+        good_quality_values=(
+            keep_quality_values if keep_quality_values else ['Correcte']
+        ),
+        extra_parameters=_get_period_parameters(
+            'date_debut_mesure', 'date_fin_mesure', start, end
+        ),
+        split_field=split_field
+    )
+
+    realtime_parameters = dict(
+        api_kind='piezometry', api_endpoint='v1/niveaux_nappes',
+        api_operation='chroniques_tr',
+        station_field='code_bss', station_code=code_bss,
+        date_field='date_mesure', date_format='%Y-%m-%dT%H:%M:%SZ',
+        date_label=date_label,
+        measure_field='niveau_eau_ngf', measure_label=measure_label,
+        aggregation_method='max',
+        extra_parameters=_get_period_parameters(
+            'date_debut_mesure', 'date_fin_mesure', start, end,
+            date_format='%Y-%m-%dT%H:%M:%SZ'
+        ),
+        split_field=split_field
+    ) if include_realtime else None
+
+    return consolidated_parameters, realtime_parameters
+
+
 def get_piezometry(
         code_bss: str, include_realtime: bool = True,
-        keep_quality_values: list = None
+        keep_quality_values: list = None,
+        start: str = None, end: str = None, dtype: str = 'float64'
 ) -> pd.DataFrame | None:
     """Collect entire record of observed piezometric data for a given
     station (in metres NGF) from ADES via Hub'Eau.
@@ -368,6 +958,27 @@ def get_piezometry(
             where to keep the time steps. If not provided, quality values
             `Correcte` are kept.
 
+        start: `str`, optional
+            The earliest date for which data is requested from Hub'Eau
+            (the period is filtered by Hub'Eau before data is sent). The
+            date must be specified in a string following the ISO
+            8601-1:2019 standard, i.e. “YYYY-MM-DD” (e.g. the 21st of May
+            2007 is “2007-05-21”). If not provided, data is collected from
+            the start of the record.
+
+        end: `str`, optional
+            The latest date for which data is requested from Hub'Eau
+            (the period is filtered by Hub'Eau before data is sent). The
+            date must be specified in a string following the ISO
+            8601-1:2019 standard, i.e. “YYYY-MM-DD” (e.g. the 21st of May
+            2007 is “2007-05-21”). If not provided, data is collected up
+            to the end of the record.
+
+        dtype: `str`, optional
+            The data type of the measures in the output (e.g. `'float32'`
+            to halve the memory footprint of the time series). If not
+            provided, set to default value `'float64'`.
+
     :Returns:
 
         `pandas.DataFrame` or `None`
@@ -406,86 +1017,207 @@ def get_piezometry(
     date_label = 'Date'
     measure_label = 'Niveau'
 
-    # get consolidated data
-    data_cons = _get_consolidated_dataframe(
-        api_kind='piezometry', api_endpoint='v1/niveaux_nappes',
-        api_operation='chroniques',
-        station_field='code_bss', station_code=code_bss,
-        date_field='date_mesure', date_format='%Y-%m-%d',
-        date_label=date_label,
-        measure_field='niveau_nappe_eau', measure_label=measure_label,
-        quality_field='qualification',
-        good_quality_values=(
-            keep_quality_values if keep_quality_values else ['Correcte']
+    # get consolidated data and real-time data (if requested) concurrently
+    data_cons, data_tr = _get_consolidated_and_realtime_dataframes(
+        *_get_piezometry_queries(
+            code_bss, date_label, measure_label,
+            include_realtime, keep_quality_values, start=start, end=end
         )
     )
 
-    data_tr = None
-    if include_realtime:
-        # get real time data
-        data_tr = _get_realtime_dataframe(
-            api_kind='piezometry', api_endpoint='v1/niveaux_nappes',
-            api_operation='chroniques_tr',
-            station_field='code_bss', station_code=code_bss,
-            date_field='date_mesure', date_format='%Y-%m-%dT%H:%M:%SZ',
-            date_label=date_label,
-            measure_field='niveau_eau_ngf', measure_label=measure_label,
-            aggregation_method='max'
-        )
-
     # return potentially merged consolidated and/or real-time data
     return _merge_consolidated_and_realtime_dataframe(
-        data_cons, data_tr, date_label, measure_label
+        data_cons, data_tr, date_label, measure_label, dtype=dtype
     )
 
 
-def _set_and_get_withdrawal_stations() -> list:
-    global _withdrawal_stations
+def get_piezometry_many(
+        codes_bss: list, include_realtime: bool = True,
+        keep_quality_values: list = None,
+        start: str = None, end: str = None, dtype: str = 'float64',
+        batch_size: int = 20, output: str = 'dict'
+) -> dict | pd.DataFrame | None:
+    """Collect entire record of observed piezometric data for several
+    stations (in metres NGF) from ADES via Hub'Eau, grouping stations
+    into multi-station queries.
+
+    :Parameters:
 
-    # (loop through departements to bypass 20000 query size limit)
-    withdrawal_stations = None
-    for departement in (
-            [f'{i:02}' for i in range(1, 96) if i != 20]
-            + ['2A', '2B', '971', '972', '973', '974', '976']
+        codes_bss: `list`
+            The codes of the piezometric stations for which groundwater
+            level data is requested from ADES via Hub'Eau.
+
+        include_realtime: `bool`, optional
+            Whether to include real-time data (if available) and
+            aggregate it with consolidated data. If not provided,
+            set to default value `True`.
+
+        keep_quality_values: `bool`, optional
+            The list of quality values in the field *qualification*
+            where to keep the time steps. If not provided, quality values
+            `Correcte` are kept.
+
+        start: `str`, optional
+            The earliest date for which data is requested from Hub'Eau
+            (the period is filtered by Hub'Eau before data is sent). The
+            date must be specified in a string following the ISO
+            8601-1:2019 standard, i.e. “YYYY-MM-DD” (e.g. the 21st of May
+            2007 is “2007-05-21”). If not provided, data is collected from
+            the start of the record.
+
+        end: `str`, optional
+            The latest date for which data is requested from Hub'Eau
+            (the period is filtered by Hub'Eau before data is sent). The
+            date must be specified in a string following the ISO
+            8601-1:2019 standard, i.e. “YYYY-MM-DD” (e.g. the 21st of May
+            2007 is “2007-05-21”). If not provided, data is collected up
+            to the end of the record.
+
+        dtype: `str`, optional
+            The data type of the measures in the output (e.g. `'float32'`
+            to halve the memory footprint of the time series). If not
+            provided, set to default value `'float64'`.
+
+        batch_size: `int`, optional
+            The maximum number of stations to group in a single query.
+            Fewer stations are grouped if their records would exceed the
+            20000 records Hub'Eau lets a query page through (based on
+            the period requested, or else on the total count returned
+            with the first page). If not provided, set to default value
+            `20`.
+
+        output: `str`, optional
+            The format of the output, either `'dict'` (one dataframe per
+            station), `'long'` (one dataframe with three columns *Station*,
+            *Date*, and *Niveau*), or `'wide'` (one dataframe with a column
+            *Date* and one column per station). If not provided, set to
+            default value `'dict'`.
+
+    :Returns:
+
+        `dict` or `pandas.DataFrame` or `None`
+            The dictionary containing the groundwater level time series
+            for each station (`None` for stations without data on Hub'Eau),
+            or the dataframe gathering all stations (`None` if no data is
+            available for any station).
+
+    **Examples**
+
+    Collecting consolidated and real-time groundwater level data for two
+    piezometric stations:
+
+    >>> get_piezometry_many(
+    ...     codes_bss=['06301X0131/F', '06288X0054/F'], output='long'
+    ... )  # doctest: +SKIP
+    """
+    # collect list of piezometric stations (if not already collected)
+    piezometry_stations = (
+        _piezometry_stations if _piezometry_stations is not None
+        else _set_and_get_piezometry_stations()
+    )
+
+    # check codes BSS are available
+    unavailable = piezometry_stations.missing(codes_bss)
+    if unavailable:
+        raise ValueError(
+            f"codes BSS {repr(unavailable)} are not "
+            f"available in Hub'Eau piezometry API"
+        )
+
+    # set headers for output dataframes
+    date_label = 'Date'
+    measure_label = 'Niveau'
+
+    frames = {}
+    for batch in _iter_batches(
+            list(dict.fromkeys(codes_bss)),
+            _get_batch_size(batch_size, start, end)
     ):
-        withdrawal_stations = pd.concat(
-            [
-                withdrawal_stations, _get_dataframe(
-                    endpoint="v1/prelevements",
-                    operation="referentiel/points_prelevement",
-                    parameters={
-                        'fields': 'code_ouvrage,code_type_milieu',
-                        'code_departement': departement,
-                        'size': 10000
-                    }
-                )
-            ]
+        # get consolidated data and real-time data (if requested)
+        # concurrently for all stations in batch
+        data_cons, data_tr = _get_consolidated_and_realtime_dataframes(
+            *_get_piezometry_queries(
+                ','.join(batch), date_label, measure_label,
+                include_realtime, keep_quality_values,
+                split_field='code_bss', start=start, end=end
+            )
         )
+        data_tr = data_tr if data_tr is not None else {}
 
-    # check whether at least one station exists
-    if withdrawal_stations is not None:
-        surface_withdrawal_stations = (
-            withdrawal_stations['code_ouvrage'][
-                withdrawal_stations['code_type_milieu'] == 'CONT'
-                ]
-        ).values.tolist()
+        for code in batch:
+            # potentially merge consolidated and/or real-time data
+            frames[code] = _merge_consolidated_and_realtime_dataframe(
+                data_cons.get(code), data_tr.get(code),
+                date_label, measure_label, dtype=dtype
+            )
 
-        underground_withdrawal_stations = (
-            withdrawal_stations['code_ouvrage'][
-                withdrawal_stations['code_type_milieu'] == 'SOUT'
-                ]
-        ).values.tolist()
+    return _format_many(frames, date_label, measure_label, output)
 
-        _withdrawal_stations = [
-            surface_withdrawal_stations, underground_withdrawal_stations
-        ]
-    else:
-        _withdrawal_stations = [[], []]
+
+def _fetch_withdrawal_stations() -> dict:
+    withdrawal_stations = _sweep_departements(
+        endpoint="v1/prelevements",
+        operation="referentiel/points_prelevement",
+        parameters={
+            'fields': ','.join(
+                ['code_ouvrage', 'code_type_milieu',
+                 'code_departement', 'longitude', 'latitude']
+            ),
+            'size': 10000
+        }
+    )
+
+    return StationRegistry.from_dataframe(
+        withdrawal_stations, 'code_ouvrage',
+        {
+            'departement': 'code_departement',
+            'milieu': 'code_type_milieu',
+            'longitude': 'longitude',
+            'latitude': 'latitude'
+        }
+    ).to_dict()
+
+
+def _set_and_get_withdrawal_stations(
+        refresh: bool = False
+) -> StationRegistry:
+    global _withdrawal_stations
+
+    # load from on-disk cache (if fresh) or from Hub'Eau
+    _withdrawal_stations = StationRegistry.from_dict(
+        _load_referential(
+            'withdrawal', _fetch_withdrawal_stations, refresh
+        )
+    )
 
     return _withdrawal_stations
 
 
-def get_withdrawal(code_ouvrage: str) -> pd.DataFrame | None:
+def _get_withdrawal_measure_label(code_ouvrage: str) -> str:
+    # collect registry of withdrawal points (if not already collected)
+    withdrawal_stations = (
+        _withdrawal_stations if _withdrawal_stations is not None
+        else _set_and_get_withdrawal_stations()
+    )
+
+    # check code ouvrage is available
+    milieu = (
+        withdrawal_stations[code_ouvrage]['milieu']
+        if code_ouvrage in withdrawal_stations else None
+    )
+    if milieu in _withdrawal_measure_labels:
+        return _withdrawal_measure_labels[milieu]
+    else:
+        raise ValueError(
+            f"code ouvrage {repr(code_ouvrage)} is not "
+            f"available in Hub'Eau piezometry API"
+        )
+
+
+def get_withdrawal(
+        code_ouvrage: str, start: str = None, end: str = None,
+        dtype: str = 'float64'
+) -> pd.DataFrame | None:
     """Collect entire record of withdrawal data for a given station
     (in cubic metres) from BNPE via Hub'Eau.
 
@@ -495,6 +1227,27 @@ def get_withdrawal(code_ouvrage: str) -> pd.DataFrame | None:
             The code of the withdrawal point for which extracted water
             volume data is requested from BNPE via Hub'Eau.
 
+        start: `str`, optional
+            The earliest date for which data is requested from Hub'Eau
+            (the period is filtered by Hub'Eau before data is sent). The
+            date must be specified in a string following the ISO
+            8601-1:2019 standard, i.e. “YYYY-MM-DD” (e.g. the 21st of May
+            2007 is “2007-05-21”). If not provided, data is collected from
+            the start of the record.
+
+        end: `str`, optional
+            The latest date for which data is requested from Hub'Eau
+            (the period is filtered by Hub'Eau before data is sent). The
+            date must be specified in a string following the ISO
+            8601-1:2019 standard, i.e. “YYYY-MM-DD” (e.g. the 21st of May
+            2007 is “2007-05-21”). If not provided, data is collected up
+            to the end of the record.
+
+        dtype: `str`, optional
+            The data type of the measures in the output (e.g. `'float32'`
+            to halve the memory footprint of the time series). If not
+            provided, set to default value `'float64'`.
+
     :Returns:
 
         `pandas.DataFrame` or `None`
@@ -517,29 +1270,9 @@ def get_withdrawal(code_ouvrage: str) -> pd.DataFrame | None:
     4 2016-01-01                12566.0
     ...
     """
-    # collect list of piezometric stations (if not already collected)
-    surface_withdrawal_stations, underground_withdrawal_stations = (
-        _withdrawal_stations if _withdrawal_stations is not None
-        else _set_and_get_withdrawal_stations()
-    )
-
-    # check code ouvrage is available
-    if code_ouvrage in surface_withdrawal_stations:
-        surface = True
-    elif code_ouvrage in underground_withdrawal_stations:
-        surface = False
-    else:
-        raise ValueError(
-            f"code ouvrage {repr(code_ouvrage)} is not "
-            f"available in Hub'Eau piezometry API"
-        )
-
     # set headers for output dataframe
     date_label = 'Date'
-    measure_label = (
-        'Prelevement continental' if surface
-        else 'Prelevement souterrain'
-    )
+    measure_label = _get_withdrawal_measure_label(code_ouvrage)
 
     # get consolidated data
     data_cons = _get_consolidated_dataframe(
@@ -550,10 +1283,269 @@ def get_withdrawal(code_ouvrage: str) -> pd.DataFrame | None:
         date_label=date_label,
         measure_field='volume', measure_label=measure_label,
         quality_field='libelle_qualification_volume',
-        good_quality_values=['Correcte']
+        good_quality_values=['Correcte'],
+        extra_parameters=_get_period_parameters(
+            'annee_min', 'annee_max', start, end, date_format='%Y'
+        )
     )
 
     # return potentially merged consolidated and/or real-time data
     return _merge_consolidated_and_realtime_dataframe(
-        data_cons, None, date_label, measure_label, date_freq='AS'
+        data_cons, None, date_label, measure_label, date_freq='YS',
+        dtype=dtype
     )
+
+
+def _get_withdrawal_departement_milieux(code_departement: str) -> dict:
+    # use registry of withdrawal points if already collected
+    if _withdrawal_stations is not None:
+        return {
+            code: _withdrawal_stations[code]['milieu']
+            for code in _withdrawal_stations.filter(
+                departement=code_departement
+            )
+        }
+
+    # otherwise only collect points of departement (rather than sweeping
+    # through all departements to collect the entire registry)
+    withdrawal_stations = _get_departement_dataframe(
+        endpoint="v1/prelevements",
+        operation="referentiel/points_prelevement",
+        parameters={
+            'fields': 'code_ouvrage,code_type_milieu',
+            'size': 10000
+        },
+        departement=code_departement
+    )
+    if withdrawal_stations is None:
+        return {}
+
+    return dict(
+        zip(
+            withdrawal_stations['code_ouvrage'].tolist(),
+            withdrawal_stations['code_type_milieu'].tolist()
+        )
+    )
+
+
+def get_withdrawal_departement(
+        code_departement: str, start: str = None, end: str = None,
+        dtype: str = 'float64'
+) -> dict:
+    """Collect entire record of withdrawal data for all the withdrawal
+    points of a given departement (in cubic metres) from BNPE via Hub'Eau,
+    paging through the departement at once rather than querying each
+    withdrawal point separately (departements with too many records for
+    one query are collected in batches of withdrawal points).
+
+    :Parameters:
+
+        code_departement: `str`
+            The code of the departement for which extracted water volume
+            data is requested from BNPE via Hub'Eau (e.g. `'76'` or
+            `'2A'`).
+
+        start: `str`, optional
+            The earliest date for which data is requested from Hub'Eau
+            (the period is filtered by Hub'Eau before data is sent). The
+            date must be specified in a string following the ISO
+            8601-1:2019 standard, i.e. “YYYY-MM-DD” (e.g. the 21st of May
+            2007 is “2007-05-21”). If not provided, data is collected from
+            the start of the record.
+
+        end: `str`, optional
+            The latest date for which data is requested from Hub'Eau
+            (the period is filtered by Hub'Eau before data is sent). The
+            date must be specified in a string following the ISO
+            8601-1:2019 standard, i.e. “YYYY-MM-DD” (e.g. the 21st of May
+            2007 is “2007-05-21”). If not provided, data is collected up
+            to the end of the record.
+
+        dtype: `str`, optional
+            The data type of the measures in the output (e.g. `'float32'`
+            to halve the memory footprint of the time series). If not
+            provided, set to default value `'float64'`.
+
+    :Returns:
+
+        `dict`
+            The dictionary containing, for each withdrawal point with data
+            on Hub'Eau (as keys), the dataframe of the withdrawn water
+            volume time series (two columns *Date* and *Prelevement
+            continental*/*Prelevement souterrain*), as returned by
+            `get_withdrawal`.
+
+    **Examples**
+
+    Collecting consolidated water withdrawal data for all extraction
+    points in Seine-Maritime:
+
+    >>> get_withdrawal_departement(code_departement='76')  # doctest: +SKIP
+    """
+    if code_departement not in _departements:
+        raise ValueError(
+            f"code departement {repr(code_departement)} is not valid"
+        )
+
+    # get type of environment of points in departement
+    milieux = _get_withdrawal_departement_milieux(code_departement)
+
+    # set headers for output dataframes (measure header is set for each
+    # withdrawal point once its type of environment is known)
+    date_label = 'Date'
+    measure_label = 'Prelevement'
+
+    parameters = dict(
+        api_kind='withdrawal', api_endpoint='v1/prelevements',
+        api_operation='chroniques',
+        date_field='annee', date_format='%Y',
+        date_label=date_label,
+        measure_field='volume', measure_label=measure_label,
+        quality_field='libelle_qualification_volume',
+        good_quality_values=['Correcte'],
+        extra_parameters=_get_period_parameters(
+            'annee_min', 'annee_max', start, end, date_format='%Y'
+        ),
+        split_field='code_ouvrage'
+    )
+
+    try:
+        # get consolidated data for entire departement split by point
+        data_cons = _get_consolidated_dataframe(
+            **parameters,
+            station_field='code_departement', station_code=code_departement,
+            max_results=_max_query_results
+        )
+    except _QueryTooLarge as e:
+        # otherwise query points of departement in batches (only those
+        # whose type of environment is known), as many as fit in one
+        # query based on the average number of records per point
+        # (queries still too large being split again)
+        codes = sorted(
+            code for code, milieu in milieux.items()
+            if milieu in _withdrawal_measure_labels
+        )
+        size = min(
+            _max_query_codes,
+            max(1, int(_max_query_results // (e.count / max(len(codes), 1))))
+        )
+
+        data_cons = {}
+        for batch in _iter_batches(codes, size):
+            data_cons.update(
+                _get_within_query_limit(
+                    _get_consolidated_dataframe,
+                    parameters | {
+                        'station_field': 'code_ouvrage',
+                        'station_code': ','.join(batch)
+                    }
+                )
+            )
+
+    frames = {}
+    for code, data in data_cons.items():
+        # skip points whose type of environment is unknown
+        milieu = milieux.get(code)
+        if milieu not in _withdrawal_measure_labels:
+            continue
+
+        data_all = _merge_consolidated_and_realtime_dataframe(
+            data, None, date_label, measure_label, date_freq='YS',
+            dtype=dtype
+        )
+        if data_all is not None:
+            frames[code] = data_all.rename(
+                columns={measure_label: _withdrawal_measure_labels[milieu]}
+            )
+
+    return frames
+
+
+def refresh_referentials(kinds: list = None) -> None:
+    """Collect the station referentials from Hub'Eau again, regardless
+    of the age of their cached version, and update the on-disk cache.
+
+    :Parameters:
+
+        kinds: `list`, optional
+            The referentials to refresh, amongst `'hydrometry'`,
+            `'piezometry'`, and `'withdrawal'`. If not provided, all
+            referentials are refreshed.
+
+    :Returns:
+
+        `None`
+
+    **Examples**
+
+    Refreshing the list of piezometric stations:
+
+    >>> refresh_referentials(['piezometry'])  # doctest: +SKIP
+    """
+    refreshers = {
+        'hydrometry': _set_and_get_hydrometry_stations,
+        'piezometry': _set_and_get_piezometry_stations,
+        'withdrawal': _set_and_get_withdrawal_stations
+    }
+
+    for kind in (kinds if kinds else refreshers):
+        if kind not in refreshers:
+            raise ValueError(
+                f"referential {repr(kind)} is not valid, it must "
+                f"be one of {', '.join(map(repr, refreshers))}"
+            )
+        refreshers[kind](refresh=True)
+
+
+def get_memory_usage(data: pd.DataFrame | dict | None) -> dict:
+    """Report the memory footprint (in bytes) of collected time series
+    for each station.
+
+    :Parameters:
+
+        data: `pandas.DataFrame` or `dict` or `None`
+            The time series as returned by any of the `get_*` functions
+            of this module, i.e. a dictionary of dataframes (one per
+            station), a *long* dataframe (with a *Station* column), a
+            *wide* dataframe (with one column per station), or a single
+            station dataframe.
+
+    :Returns:
+
+        `dict`
+            The dictionary containing the memory footprint (in bytes) for
+            each station (as keys). For a *wide* dataframe or a single
+            station dataframe, each measure column is reported (the shared
+            *Date* column being excluded).
+
+    **Examples**
+
+    >>> get_memory_usage(
+    ...     get_hydrometry_many(['M107302001', 'M108201001'])
+    ... )  # doctest: +SKIP
+    {'M107302001': 161552, 'M108201001': 159456}
+    """
+    if data is None:
+        return {}
+
+    if isinstance(data, dict):
+        return {
+            code: (
+                int(frame.memory_usage(deep=True, index=False).sum())
+                if frame is not None else 0
+            )
+            for code, frame in data.items()
+        }
+
+    if 'Station' in data.columns:
+        return {
+            code: int(group.memory_usage(deep=True, index=False).sum())
+            for code, group in data.groupby(
+                'Station', observed=True, sort=False
+            )
+        }
+
+    return {
+        column: int(data[column].memory_usage(deep=True, index=False))
+        for column in data.columns if column != 'Date'
+    }
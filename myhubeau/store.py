@@ -4,7 +4,22 @@ import numpy as np
 import pandas as pd
 from datetime import datetime
 
-from .collect import get_hydrometry, get_piezometry, get_withdrawal
+from .collect import (
+    get_hydrometry, get_piezometry, get_withdrawal,
+    get_withdrawal_departement, _get_withdrawal_measure_label
+)
+from ._merge import _get_index, _merge_many
+from mygardenia._prn import _write_prn_file, _read_prn_sidecar
+
+
+# how far back to collect again data already stored (to capture revisions
+# of recent consolidated values) when updating PRN files incrementally
+_revision_windows = {
+    'hydrometry': pd.DateOffset(days=90),
+    'piezometry': pd.DateOffset(days=90),
+    # i.e. from the start of the year preceding the last stored year
+    'withdrawal': pd.offsets.YearBegin(2)
+}
 
 
 def _manage_working_directory(working_dir: str):
@@ -15,11 +30,167 @@ def _manage_working_directory(working_dir: str):
     )
 
 
+def _get_prn_filename(measure_label: str, filename: str = None) -> str:
+    return (
+        filename if filename else
+        f"my-{measure_label.lower().replace(' ', '-')}.prn"
+    )
+
+
+def _read_prn_file(
+        working_dir: str, measure_label: str,
+        missing_value: float, filename: str = None
+) -> pd.DataFrame | None:
+    filepath = os.sep.join(
+        [working_dir, "data", _get_prn_filename(measure_label, filename)]
+    )
+    if not os.path.exists(filepath):
+        return None
+
+    # prefer binary copy of PRN file (if up to date)
+    df = _read_prn_sidecar(filepath)
+
+    if df is None:
+        df = pd.read_csv(
+            filepath, delimiter='\t',
+            parse_dates=['Date'], date_format='%d/%m/%Y'
+        )
+
+    # turn missing value flag back into NaN
+    if not np.isnan(missing_value):
+        df.loc[df[measure_label] == missing_value, measure_label] = np.nan
+
+    return df
+
+
+def _get_incremental_start(
+        df_stored: pd.DataFrame | None, measure_label: str,
+        revision_window: pd.DateOffset
+) -> str | None:
+    if df_stored is None:
+        return None
+
+    # find last date with a stored value
+    valid = df_stored['Date'][df_stored[measure_label].notna()]
+    if valid.empty:
+        return None
+
+    # go back in time to also collect revisions of recent values
+    return (valid.iloc[-1] - revision_window).strftime('%Y-%m-%d')
+
+
+def _get_stored_df_and_start(
+        incremental: bool, working_dir: str, measure_label: str,
+        missing_value: float, filename: str,
+        revision_window: pd.DateOffset, start: str = None
+) -> tuple:
+    if not incremental:
+        return None, None
+
+    df_stored = _read_prn_file(
+        working_dir, measure_label, missing_value, filename
+    )
+
+    # collect entire requested period if it starts before stored period
+    # (since older data would never be collected otherwise)
+    if (df_stored is not None) and (start is not None) and (
+            df_stored.empty
+            or (pd.Timestamp(start) < df_stored['Date'].iloc[0])
+    ):
+        return df_stored, None
+
+    return (
+        df_stored,
+        _get_incremental_start(df_stored, measure_label, revision_window)
+    )
+
+
+def _get_query_start(start: str = None, since: str = None) -> str | None:
+    # only collect from the latest of requested start and incremental start
+    if (start is None) or (since is None):
+        return since if start is None else start
+
+    return max(pd.Timestamp(start), pd.Timestamp(since)).strftime('%Y-%m-%d')
+
+
+def _merge_with_stored_df(
+        df_stored: pd.DataFrame, df_new: pd.DataFrame | None,
+        measure_label: str, since: str
+) -> pd.DataFrame:
+    if df_new is None:
+        return df_stored
+
+    # keep stored values prior to collected window, and favour newly
+    # collected values (including revisions) within window
+    since = pd.Timestamp(since)
+    df_new = df_new[df_new['Date'] >= since]
+
+    return pd.concat(
+        [
+            df_stored[df_stored['Date'] < since],
+            df_new[['Date', measure_label]]
+        ],
+        ignore_index=True
+    )
+
+
+def _trim_missing(df: pd.DataFrame, measure_label: str) -> pd.DataFrame:
+    valid = np.flatnonzero(df[measure_label].notna().values)
+    if valid.size == 0:
+        return df.iloc[0:0]
+
+    return df.iloc[valid[0]:valid[-1] + 1]
+
+
+def _is_unchanged(
+        df_stored: pd.DataFrame, df_merged: pd.DataFrame,
+        measure_label: str, start: str = None, end: str = None
+) -> bool:
+    # check that requested period matches stored period
+    if start is not None:
+        if df_stored['Date'].iloc[0] != pd.Timestamp(start):
+            return False
+    if end is not None:
+        if df_stored['Date'].iloc[-1] != pd.Timestamp(end):
+            return False
+
+    # compare stored and merged series over their periods with data
+    a = _trim_missing(df_stored, measure_label)
+    b = _trim_missing(df_merged, measure_label)
+
+    return (
+        (len(a) == len(b))
+        and np.array_equal(
+            a['Date'].values.astype('datetime64[D]'),
+            b['Date'].values.astype('datetime64[D]')
+        )
+        and np.allclose(
+            a[measure_label].values.astype(float),
+            b[measure_label].values.astype(float),
+            rtol=0, atol=1e-9, equal_nan=True
+        )
+    )
+
+
 def _save_df_as_prn_file(
-        df: pd.DataFrame, working_dir: str, measure_label: str,
+        df: pd.DataFrame | None, working_dir: str, measure_label: str,
         missing_value: float, filename: str = None,
         start: str = None, end: str = None, freq: str = 'D'
-) -> None:
+) -> bool:
+    # no data collected (e.g. requested period without any record)
+    if df is None:
+        if (start is None) or (end is None):
+            raise RuntimeError(
+                f"no data available to store for {measure_label.lower()}, "
+                f"start and end dates required to store an empty period"
+            )
+        df = pd.DataFrame(
+            {
+                'Date': pd.DatetimeIndex([]),
+                measure_label: np.array([], dtype='float64')
+            }
+        )
+
     # deal with working directory
     _manage_working_directory(working_dir)
 
@@ -33,27 +204,58 @@ def _save_df_as_prn_file(
         else datetime.strptime(end, '%Y-%m-%d')
     )
 
-    df = df.set_index('Date')
-    df = df.reindex(pd.date_range(start, end, freq=freq), fill_value=np.nan)
-    df = df.reset_index(names='Date')
+    dates = pd.date_range(start, end, freq=freq)
+    values = df.set_index('Date')[measure_label].reindex(dates).values
 
-    # convert to "excel" date for Gardenia
-    df['Date'] = df['Date'].dt.strftime('%d/%m/%Y')
+    # save as PRN file (with "excel" dates for Gardenia, and missing
+    # data filled in with missing value flag)
+    filename = _get_prn_filename(measure_label, filename)
+    return _write_prn_file(
+        os.sep.join([working_dir, "data", filename]),
+        dates, {measure_label: values}, missing_value
+    )
 
-    # fill in missing data with missing value flag
-    if df[measure_label].isna().any():
-        df.loc[df[measure_label].isna(), measure_label] = missing_value
 
-    # save as PRN file
-    filename = (
-        filename if filename else
-        f"my-{measure_label.lower().replace(' ', '-')}.prn"
+def _disaggregate_annual_values(years: np.ndarray, values: np.ndarray):
+    # years are consecutive year starts, and values are the corresponding
+    # annual values (one column per withdrawal point for a 2-D block)
+    years = np.asarray(years).astype('datetime64[Y]')
+    values = np.asarray(values, dtype='float64')
+    block = values.reshape(len(years), -1)
+
+    # number of days in each year
+    bounds = np.append(years, years[-1] + 1).astype('datetime64[D]')
+    days = np.diff(bounds).astype(np.int64)
+
+    # carry last known annual value forward over missing years
+    rows = np.where(
+        np.isnan(block), 0, np.arange(len(years))[:, np.newaxis]
     )
-    df.to_csv(
-        os.sep.join(
-            [working_dir, "data", filename]
-        ),
-        index=False, sep='\t'
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    block = block[rows, np.arange(block.shape[1])]
+
+    # spread each annual value evenly over the days of its year
+    daily = np.repeat(block / days[:, np.newaxis], days, axis=0)
+
+    # round to 3 decimals
+    np.round(daily, 3, out=daily)
+
+    return (
+        np.arange(bounds[0], bounds[-1], dtype='datetime64[D]'),
+        daily.reshape((-1,) + values.shape[1:])
+    )
+
+
+def _disaggregate_withdrawal(
+        df: pd.DataFrame, measure_label: str
+) -> pd.DataFrame:
+    # resample to daily values
+    dates, daily = _disaggregate_annual_values(
+        df['Date'].values, df[measure_label].values
+    )
+
+    return pd.DataFrame(
+        {'Date': dates.astype('datetime64[ns]'), measure_label: daily}
     )
 
 
@@ -62,7 +264,8 @@ def save_hydrometry(
         filename: str = None,
         start: str = None, end: str = None,
         include_realtime: bool = True,
-        keep_quality_values: list = None
+        keep_quality_values: list = None,
+        incremental: bool = False
 ):
     """Generate a PRN file containing the observed hydrometric data
     for a given station.
@@ -103,9 +306,19 @@ def save_hydrometry(
             `16` ("correct"), and `20` ("good"). If not provided, quality values
             `16` and `20` are kept.
 
+        incremental: `bool`, optional
+            Whether to only collect data more recent than the data already
+            stored in the PRN file (if it exists), going back a little in
+            time to capture revisions of recent values, and to merge them
+            with the stored data. The PRN file is not rewritten if nothing
+            changed. If not provided, set to default value `False`.
+
     :Returns:
 
-        `None`
+        `bool`
+            Whether the PRN file was written, i.e. `False` if it already
+            existed with the same content (in which case it is left
+            untouched).
 
     **Examples**
 
@@ -145,11 +358,26 @@ def save_hydrometry(
     ...     filename='debit-M107302001.prn'
     ... )
     """
+    # determine period to collect (if updating incrementally)
+    df_stored, since = _get_stored_df_and_start(
+        incremental, working_dir, 'Debit', -2, filename,
+        _revision_windows['hydrometry'], start
+    )
+
     # collect data as dataframe
-    df = get_hydrometry(code_station, include_realtime, keep_quality_values)
+    df = get_hydrometry(
+        code_station, include_realtime, keep_quality_values,
+        start=_get_query_start(start, since), end=end
+    )
+
+    # merge with stored data (if updating incrementally)
+    if since is not None:
+        df = _merge_with_stored_df(df_stored, df, 'Debit', since)
+        if _is_unchanged(df_stored, df, 'Debit', start, end):
+            return False
 
     # store as PRN file
-    _save_df_as_prn_file(
+    return _save_df_as_prn_file(
         df, working_dir, 'Debit', -2, filename, start, end
     )
 
@@ -159,7 +387,8 @@ def save_piezometry(
         filename: str = None,
         start: str = None, end: str = None,
         include_realtime: bool = True,
-        keep_quality_values: list = None
+        keep_quality_values: list = None,
+        incremental: bool = False
 ):
     """Generate a PRN file containing the observed piezometric data
     for a given station.
@@ -199,9 +428,19 @@ def save_piezometry(
             where to keep the time steps. If not provided, quality values
             `Correcte` are kept.
 
+        incremental: `bool`, optional
+            Whether to only collect data more recent than the data already
+            stored in the PRN file (if it exists), going back a little in
+            time to capture revisions of recent values, and to merge them
+            with the stored data. The PRN file is not rewritten if nothing
+            changed. If not provided, set to default value `False`.
+
     :Returns:
 
-        `None`
+        `bool`
+            Whether the PRN file was written, i.e. `False` if it already
+            existed with the same content (in which case it is left
+            untouched).
 
     **Examples**
 
@@ -213,13 +452,26 @@ def save_piezometry(
     ...     code_bss='06301X0131/F', working_dir='examples/my_example'
     ... )
     """
+    # determine period to collect (if updating incrementally)
+    df_stored, since = _get_stored_df_and_start(
+        incremental, working_dir, 'Niveau', 9999, filename,
+        _revision_windows['piezometry'], start
+    )
+
     # collect data as dataframe
     df = get_piezometry(
-        code_bss, include_realtime, keep_quality_values
+        code_bss, include_realtime, keep_quality_values,
+        start=_get_query_start(start, since), end=end
     )
 
+    # merge with stored data (if updating incrementally)
+    if since is not None:
+        df = _merge_with_stored_df(df_stored, df, 'Niveau', since)
+        if _is_unchanged(df_stored, df, 'Niveau', start, end):
+            return False
+
     # store as PRN file
-    _save_df_as_prn_file(
+    return _save_df_as_prn_file(
         df, working_dir, 'Niveau', 9999, filename, start, end
     )
 
@@ -227,7 +479,8 @@ def save_piezometry(
 def save_withdrawal(
         code_ouvrage: str, working_dir: str,
         filename: str = None,
-        start: str = None, end: str = None
+        start: str = None, end: str = None,
+        incremental: bool = False
 ):
     """Generate a PRN file containing the withdrawal data for a given
     station from BNPE via Hub'Eau.
@@ -257,9 +510,19 @@ def save_withdrawal(
             i.e. “YYYY-MM-DD” (e.g. the 21st of May 2007 is “2007-05-21”).
             If not provided, the latest date in the available data is used.
 
+        incremental: `bool`, optional
+            Whether to only collect data more recent than the data already
+            stored in the PRN file (if it exists), going back a little in
+            time to capture revisions of recent values, and to merge them
+            with the stored data. The PRN file is not rewritten if nothing
+            changed. If not provided, set to default value `False`.
+
     :Returns:
 
-        `None`
+        `bool`
+            Whether the PRN file was written, i.e. `False` if it already
+            existed with the same content (in which case it is left
+            untouched).
 
     **Examples**
 
@@ -271,24 +534,122 @@ def save_withdrawal(
     ...     code_ouvrage='OPR0000000003', working_dir='examples/my_example'
     ... )
     """
-    # collect data as dataframe
-    df = get_withdrawal(code_ouvrage)
-    measure_label = df.columns.drop('Date')[0]
+    measure_label = _get_withdrawal_measure_label(code_ouvrage)
 
-    # resample to daily values
-    df['Date'] = pd.period_range(
-        start=df['Date'].iloc[0], end=df['Date'].iloc[-1], freq='A'
+    # determine period to collect (if updating incrementally)
+    df_stored, since = _get_stored_df_and_start(
+        incremental, working_dir, measure_label, np.nan, filename,
+        _revision_windows['withdrawal'], start
     )
-    df = df.set_index('Date')
-    df = df.resample('D', convention='start').asfreq().ffill()
-    df = df / df.groupby(df.index.year).transform(len)
-    df.index = df.index.to_timestamp()
-    df = df.reset_index()
 
-    # round to 3 decimals
-    df[measure_label] = df[measure_label].round(3)
+    # collect data as dataframe
+    df = get_withdrawal(
+        code_ouvrage, start=_get_query_start(start, since), end=end
+    )
+
+    if df is not None:
+        df = _disaggregate_withdrawal(df, measure_label)
+
+    # merge with stored data (if updating incrementally)
+    if since is not None:
+        df = _merge_with_stored_df(df_stored, df, measure_label, since)
+        if _is_unchanged(df_stored, df, measure_label, start, end):
+            return False
 
     # store as PRN file
-    _save_df_as_prn_file(
+    return _save_df_as_prn_file(
         df, working_dir, measure_label, np.nan, filename, start, end
     )
+
+
+def save_withdrawal_departement(
+        code_departement: str, working_dir: str,
+        start: str = None, end: str = None
+):
+    """Generate one PRN file per withdrawal point of a given departement
+    containing its withdrawal data from BNPE via Hub'Eau, collecting the
+    entire departement at once.
+
+    :Parameters:
+
+        code_departement: `str`
+            The code of the departement for which extracted water volume
+            data is requested from BNPE via Hub'Eau (e.g. `'76'` or
+            `'2A'`).
+
+        working_dir: `str`
+            The file path the working directory to use to store the data.
+
+        start: `str`, optional
+            The start date to use for the data time series. The date must
+            be specified in a string following the ISO 8601-1:2019 standard,
+            i.e. “YYYY-MM-DD” (e.g. the 21st of May 2007 is “2007-05-21”).
+            If not provided, the earliest date in the available data is used.
+
+        end: `str`, optional
+            The end date to use for the data time series. The date must
+            be specified in a string following the ISO 8601-1:2019 standard,
+            i.e. “YYYY-MM-DD” (e.g. the 21st of May 2007 is “2007-05-21”).
+            If not provided, the latest date in the available data is used.
+
+    :Returns:
+
+        `dict`
+            Whether the PRN file of each withdrawal point (as keys) was
+            written, i.e. `False` if it already existed with the same
+            content (in which case it is left untouched).
+
+    **Examples**
+
+    Generating PRN files named after each extraction point of
+    Seine-Maritime (e.g. *my-prelevement-souterrain-opr0000000003.prn*)
+    in *examples/my_example/data*:
+
+    >>> save_withdrawal_departement(
+    ...     code_departement='76', working_dir='examples/my_example'
+    ... )  # doctest: +SKIP
+    """
+    # collect data for all points as dataframes
+    frames = get_withdrawal_departement(code_departement, start, end)
+    if not frames:
+        return {}
+
+    # align all points on a shared annual index and resample them to
+    # daily values at once
+    index = _get_index(
+        [df['Date'].values for df in frames.values()], freq='YS'
+    )
+    dates, daily = _disaggregate_annual_values(
+        index.values,
+        _merge_many(
+            index,
+            [
+                [(df['Date'].values, df[df.columns[1]].values)]
+                for df in frames.values()
+            ]
+        )
+    )
+
+    written = {}
+    for j, (code, df) in enumerate(frames.items()):
+        measure_label = df.columns[1]
+
+        # restrict to years covered by point
+        years = df['Date'].values.astype('datetime64[Y]')
+        first, last = np.searchsorted(
+            dates, [years[0], years[-1] + 1]
+        )
+
+        # store as PRN file
+        written[code] = _save_df_as_prn_file(
+            pd.DataFrame(
+                {
+                    'Date': dates[first:last].astype('datetime64[ns]'),
+                    measure_label: daily[first:last, j]
+                }
+            ),
+            working_dir, measure_label, np.nan,
+            _get_prn_filename(f"{measure_label} {code}"), start, end
+        )
+
+    return written
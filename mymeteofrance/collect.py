@@ -1,13 +1,54 @@
 import requests
+import os
 import time
 import io
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
 import datetime
+from email.utils import parsedate_to_datetime
+
+from mygardenia._json import _load_json_cache
 
 
 # "global" (module-wide) variables for memoization
 _meteorology_stations = None
+# (i.e. catalogue along with the time it was collected at)
+_meteorology_catalogue = None
+_catalogue_lock = threading.Lock()
+
+# "global" (module-wide) variables for caching of station catalogue
+_catalogue_settings = {
+    'directory': os.sep.join([os.path.dirname(__file__), "database"]),
+    # one week
+    'ttl': 7 * 24 * 3600,
+    'max_workers': 4
+}
+
+_catalogue_departements = (
+    [str(i) for i in range(1, 96)]
+    + ['971', '972', '973', '974', '975']
+    + ['984', '985', '986', '987', '988']
+)
+
+# "global" (module-wide) variables for request budget (kept a little
+# under the quota of 50 requests per minute to absorb latency and clock
+# differences with the server)
+_request_budget = {'requests': 48, 'period': 60.}
+_request_times = deque()
+_request_pause = {'until': 0.}
+_request_lock = threading.Lock()
+
+# "global" (module-wide) variables for polling of order files
+_polling_settings = {
+    'first_delay': 2.,
+    'backoff': 1.5,
+    'max_interval': 30.,
+    'deadline': 900.
+}
+_order_history = deque(maxlen=200)
 
 _meteorology_daily_variables = {
     "BA300": "HAUTEUR MINIMALE DE LA COUCHE >300M AVEC UNE NEBULOSITE MAXI > 4/8",
@@ -80,17 +121,124 @@ _meteorology_daily_variables = {
 }
 
 
+def _wait_for_request_slot() -> None:
+    while True:
+        with _request_lock:
+            now = time.monotonic()
+
+            # forget requests sent before the current budget period
+            while _request_times and (
+                    now - _request_times[0] >= _request_budget['period']
+            ):
+                _request_times.popleft()
+
+            if now < _request_pause['until']:
+                # hold all requests while server asks to wait
+                wait = _request_pause['until'] - now
+            elif len(_request_times) < _request_budget['requests']:
+                # take a slot if budget is not exhausted
+                _request_times.append(now)
+                return
+            else:
+                # wait for oldest request to leave budget period
+                wait = _request_budget['period'] - (now - _request_times[0])
+
+        time.sleep(wait)
+
+
+def _get_retry_delay(r: requests.Response) -> float:
+    # respect delay requested by server (in seconds or as a date)
+    retry_after = r.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return max(float(retry_after), 0.)
+        except ValueError:
+            try:
+                return max(
+                    (
+                        parsedate_to_datetime(retry_after)
+                        - datetime.datetime.now(datetime.timezone.utc)
+                    ).total_seconds(),
+                    0.
+                )
+            except (TypeError, ValueError):
+                pass
+
+    # otherwise, wait for oldest request to leave budget period
+    with _request_lock:
+        if _request_times:
+            return max(
+                _request_budget['period']
+                - (time.monotonic() - _request_times[0]),
+                1.
+            )
+
+    return 1.
+
+
+def _request(url: str, api_key: str) -> requests.Response:
+    while True:
+        # keep within budget of requests
+        _wait_for_request_slot()
+
+        r = requests.get(url, headers={'apikey': api_key})
+
+        if r.status_code != 429:
+            return r
+
+        # too many requests, so hold all requests (not only this one)
+        # for as long as necessary before trying again
+        delay = _get_retry_delay(r)
+        with _request_lock:
+            _request_pause['until'] = max(
+                _request_pause['until'], time.monotonic() + delay
+            )
+
+
+def configure_rate_limit(
+        max_requests: int = None, period: float = None
+) -> None:
+    """Configure the client-side limit on the number of requests sent to
+    the MeteoFrance API, shared by all queries (including concurrent
+    ones).
+
+    :Parameters:
+
+        max_requests: `int`, optional
+            The maximum number of requests that can be sent over the
+            period. If not provided, the current value is kept (default
+            value is `48`, i.e. just under the quota of the MeteoFrance
+            API of 50 requests per minute).
+
+        period: `float`, optional
+            The duration (in seconds) of the sliding period over which
+            requests are counted. If not provided, the current value is
+            kept (default value is `60`).
+
+    :Returns:
+
+        `None`
+
+    **Examples**
+
+    Keeping a wider safety margin below the quota of the MeteoFrance API:
+
+    >>> configure_rate_limit(max_requests=45)
+    """
+    with _request_lock:
+        if max_requests is not None:
+            _request_budget['requests'] = max_requests
+        if period is not None:
+            _request_budget['period'] = period
+
+
 def _get_json(
         url: str, api_key: str, success_code: int
 ) -> list | dict | None:
-    r = requests.get(url, headers={'apikey': api_key})
+    r = _request(url, api_key)
 
     if r.status_code == success_code:
         return r.json()
-    elif r.status_code == 429:
-        # too many requests, so delay before trying again (50 requests per min)
-        time.sleep(60)
-        return _get_json(url, api_key, success_code)
     else:
         raise RuntimeError(
             f"JSON retrieval failed (code: {r.status_code}) "
@@ -98,21 +246,41 @@ def _get_json(
         )
 
 
-def _get_text(url: str, api_key: str) -> str | None:
+def _order_data(station_id: int, start: str, end: str, api_key: str) -> str:
+    # order data
+    params = {
+        'id-station': station_id,
+        'date-deb-periode': start,
+        'date-fin-periode': end
+    }
+
+    return _get_json(
+        'https://public-api.meteofrance.fr/public/DPClim/v1/'
+        'commande-station/quotidienne?'
+        + f"{'&'.join(['='.join([k, str(v)]) for k, v in params.items()])}",
+        api_key=api_key, success_code=202
+    )['elaboreProduitAvecDemandeResponse']['return']
+
+
+def _poll_order(order_id: str, api_key: str) -> tuple:
+    url = (
+        'https://public-api.meteofrance.fr/public/DPClim/v1/'
+        f'commande/fichier?id-cmde={order_id}'
+    )
+
     # request order
-    r = requests.get(url, headers={'apikey': api_key})
+    r = _request(url, api_key)
 
-    # retrieve order as text
+    # retrieve order as text (if ready)
     if r.status_code == 201:
         # file returned
-        return r.text
+        return True, r.text
     elif r.status_code == 204:
         # file still being processed
-        time.sleep(1)
-        return _get_text(url, api_key)
+        return False, None
     elif r.status_code == 500:
         # order failed (most likely because empty slice)
-        return None
+        return True, None
     else:
         raise RuntimeError(
             f"TEXT retrieval failed (code: {r.status_code}) "
@@ -120,35 +288,179 @@ def _get_text(url: str, api_key: str) -> str | None:
         )
 
 
-def _get_data(station_id: int, start: str, end: str, api_key: str) -> str:
-    # order data
-    params = {
-        'id-station': station_id,
-        'date-deb-periode': start,
-        'date-fin-periode': end
-    }
+def _get_first_poll_delay() -> float:
+    # expect files to take as long to prepare as recent orders did
+    prep_times = sorted(
+        o['prep_time'] for o in _order_history if o['status'] == 'collected'
+    )
+    if not prep_times:
+        return _polling_settings['first_delay']
+
+    return prep_times[len(prep_times) // 2]
+
+
+def _get_data_many(station_id: int, periods: list, api_key: str) -> list:
+    # submit all orders up front so that MeteoFrance prepares their files
+    # while other orders are being submitted or collected
+    first_delay = _get_first_poll_delay()
+    pending = {}
+    for i, (start, end) in enumerate(periods):
+        order_id = _order_data(station_id, start, end, api_key)
+        now = time.monotonic()
+        pending[order_id] = {
+            'index': i, 'submitted': now, 'polls': 0, 'not_ready': 0.,
+            'interval': first_delay, 'next_poll': now + first_delay
+        }
+
+    # poll orders when due (backing off while their files are still being
+    # prepared), collecting files as they complete
+    data = [None] * len(periods)
+    expired = []
+    while pending:
+        order_id, order = min(
+            pending.items(), key=lambda o: o[1]['next_poll']
+        )
 
-    order_id = _get_json(
-        'https://public-api.meteofrance.fr/public/DPClim/v1/'
-        'commande-station/quotidienne?'
-        + f"{'&'.join(['='.join([k, str(v)]) for k, v in params.items()])}",
-        api_key=api_key, success_code=202
-    )['elaboreProduitAvecDemandeResponse']['return']
+        # wait for next order due to be polled
+        wait = order['next_poll'] - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+        # (time taken once request is through, i.e. not counting time
+        # spent waiting for the rate limiter)
+        done, text = _poll_order(order_id, api_key)
+        order['polls'] += 1
+        elapsed = time.monotonic() - order['submitted']
+        prep_time = None
+
+        if done:
+            status = 'collected' if text is not None else 'failed'
+            # file got ready between last poll finding it still being
+            # prepared and this poll (so that the estimate can go down
+            # when polls come late, as well as up when they come early)
+            prep_time = (order['not_ready'] + elapsed) / 2
+        elif elapsed > _polling_settings['deadline']:
+            status = 'expired'
+        else:
+            order['not_ready'] = elapsed
 
-    # collect order and return it
-    return _get_text(
-        'https://public-api.meteofrance.fr/public/DPClim/v1/'
-        f'commande/fichier?id-cmde={order_id}',
-        api_key=api_key
-    )
+            # poll less and less often so that long orders do not use up
+            # the budget of requests
+            order['interval'] = min(
+                order['interval'] * _polling_settings['backoff'],
+                _polling_settings['max_interval']
+            )
+            order['next_poll'] = time.monotonic() + order['interval']
+            continue
+
+        data[order['index']] = text
+        del pending[order_id]
+
+        if status == 'expired':
+            expired.append(order_id)
+        _order_history.append(
+            {
+                'order_id': order_id, 'station_id': station_id,
+                'period': periods[order['index']], 'status': status,
+                'polls': order['polls'], 'duration': elapsed,
+                'prep_time': prep_time
+            }
+        )
 
+    # do not let orders given up on pass for periods without data
+    if expired:
+        raise RuntimeError(
+            f"order(s) {', '.join(expired)} for station {station_id} "
+            f"still not ready after {_polling_settings['deadline']:g} "
+            f"seconds"
+        )
+
+    return data
 
-def _get_dataframe(
-        variables: list, station_id: int, start: str, end: str, api_key: str
-) -> pd.DataFrame | None:
-    # collect data
-    data = _get_data(station_id, start, end, api_key)
 
+def configure_polling(
+        first_delay: float = None, backoff: float = None,
+        max_interval: float = None, deadline: float = None
+) -> None:
+    """Configure how often the files of orders placed with the MeteoFrance
+    API are polled while they are being prepared.
+
+    :Parameters:
+
+        first_delay: `float`, optional
+            The delay (in seconds) before the first poll of an order when
+            no order has been collected yet (afterwards, the median
+            estimated time taken to prepare recent orders is used). If not provided, the
+            current value is kept (default value is `2`).
+
+        backoff: `float`, optional
+            The factor by which the interval between two polls of the
+            same order grows while its file is still being prepared. If
+            not provided, the current value is kept (default value is
+            `1.5`).
+
+        max_interval: `float`, optional
+            The maximum interval (in seconds) between two polls of the
+            same order. If not provided, the current value is kept
+            (default value is `30`).
+
+        deadline: `float`, optional
+            The time (in seconds) after which an order whose file is
+            still not ready is given up, in which case an error is raised
+            (rather than treating its period as without data). If not
+            provided, the current value is kept (default value is
+            `900`).
+
+    :Returns:
+
+        `None`
+
+    **Examples**
+
+    Giving up on orders not ready after 5 minutes:
+
+    >>> configure_polling(deadline=300)
+    """
+    for key, value in (
+            ('first_delay', first_delay),
+            ('backoff', backoff),
+            ('max_interval', max_interval),
+            ('deadline', deadline)
+    ):
+        if value is not None:
+            _polling_settings[key] = value
+
+
+def get_order_stats() -> list:
+    """Report, for the most recent orders placed with the MeteoFrance API,
+    how long their files took to prepare and how many times they were
+    polled.
+
+    :Returns:
+
+        `list`
+            The list of the most recent orders (up to 200), each as a
+            dictionary with keys *order_id*, *station_id*, *period*,
+            *status* (`'collected'`, `'failed'` if MeteoFrance could not
+            prepare the file, or `'expired'` if the deadline was reached),
+            *polls* (the number of polls), *duration* (the time in
+            seconds between order and collection), and *prep_time* (the
+            estimated time in seconds MeteoFrance took to prepare the
+            file, i.e. halfway between the last poll finding it not ready
+            and the poll collecting it, or `None` if not collected).
+
+    **Examples**
+
+    >>> get_order_stats()  # doctest: +SKIP
+    [{'order_id': '2024...', 'station_id': 76116001, ...}]
+    """
+    return list(_order_history)
+
+
+def _parse_dataframe(
+        data: str | None, variables: list, station_id: int,
+        start: str, end: str
+) -> pd.DataFrame | None:
     if data is not None:
         # convert text to dataframe
         df = pd.read_csv(
@@ -184,63 +496,161 @@ def _get_dataframe(
             f"for period {start} to {end}"
         )
 
-        return None
+
+def _get_dataframes(
+        variables: list, station_id: int, periods: list, api_key: str
+) -> list:
+    # collect data for all periods at once
+    data = _get_data_many(station_id, periods, api_key)
+
+    return [
+        _parse_dataframe(text, variables, station_id, start, end)
+        for text, (start, end) in zip(data, periods)
+    ]
+
+
+def _fetch_meteorology_catalogue(api_key: str) -> dict:
+    def fetch(dpt):
+        return _get_json(
+            'https://public-api.meteofrance.fr/'
+            'public/DPClim/v1/liste-stations/quotidienne?'
+            f'id-departement={dpt}',
+            api_key=api_key, success_code=200
+        ) or []
+
+    # query departements concurrently (requests are still sent within
+    # the request budget shared by all threads)
+    with ThreadPoolExecutor(
+            max_workers=_catalogue_settings['max_workers']
+    ) as executor:
+        records = [
+            record
+            for dpt_records in executor.map(fetch, _catalogue_departements)
+            for record in dpt_records
+        ]
+
+    # store catalogue column-wise (union of fields across all records)
+    fields = dict.fromkeys(field for record in records for field in record)
+
+    return {
+        field: [record.get(field) for record in records]
+        for field in fields
+    }
+
+
+def _get_catalogue_filename() -> str:
+    return os.sep.join(
+        [_catalogue_settings['directory'], "liste_stations_quotidienne.json"]
+    )
+
+
+def _load_meteorology_catalogue(api_key: str, refresh: bool = False) -> dict:
+    global _meteorology_catalogue
+
+    # only let one thread load catalogue at a time (others then use it)
+    with _catalogue_lock:
+        # use catalogue already loaded (if still fresh)
+        if (not refresh) and (_meteorology_catalogue is not None):
+            content, timestamp = _meteorology_catalogue
+            if time.time() - timestamp <= _catalogue_settings['ttl']:
+                return content
+
+        # load from on-disk cache (if fresh) or from MeteoFrance
+        _meteorology_catalogue = _load_json_cache(
+            _get_catalogue_filename(), _catalogue_settings['ttl'],
+            lambda: _fetch_meteorology_catalogue(api_key), refresh,
+            'station catalogue'
+        )
+
+        return _meteorology_catalogue[0]
 
 
 def _set_and_get_meteorology_stations(
         api_key: str, station_types: tuple = None,
         open_stations_only: bool = True,
-        public_stations_only: bool = True
+        public_stations_only: bool = True,
+        refresh: bool = False
 ) -> list:
     global _meteorology_stations
 
-    # set list of available stations still in operation
-    meteorology_stations = None
-    for dpt in (
-            [i for i in range(1, 96)]
-            + ['971', '972', '973', '974', '975']
-            + ['984', '985', '986', '987', '988']
-    ):
-        meteorology_stations = pd.concat(
-            [
-                meteorology_stations,
-                pd.concat(
-                    [
-                        pd.DataFrame.from_dict(i, orient='index')
-                        for i in _get_json(
-                            'https://public-api.meteofrance.fr/'
-                            'public/DPClim/v1/liste-stations/quotidienne?'
-                            f'id-departement={dpt}',
-                            api_key=api_key, success_code=200
-                        )
-                    ],
-                    axis=1
-                ).T
-            ]
-        )
+    # load catalogue of all stations (filtered here rather than when
+    # collected so that any combination of filters can reuse it)
+    catalogue = _load_meteorology_catalogue(api_key, refresh)
 
     # check whether at least one station exists
-    if meteorology_stations is not None:
-        mask = np.ones(len(meteorology_stations), dtype=bool)
+    if catalogue.get('id'):
+        ids = np.asarray(catalogue['id'], dtype=object)
+        mask = np.ones(len(ids), dtype=bool)
 
         if station_types:
-            mask = mask & np.isin(
-                meteorology_stations['typePoste'].values, station_types
+            mask &= np.isin(
+                np.asarray(catalogue['typePoste'], dtype=object),
+                station_types
             )
         if open_stations_only:
-            mask = mask & meteorology_stations['posteOuvert'].values
+            mask &= np.asarray(
+                [bool(v) for v in catalogue['posteOuvert']], dtype=bool
+            )
         if public_stations_only:
-            mask = mask & meteorology_stations['postePublic'].values
+            mask &= np.asarray(
+                [bool(v) for v in catalogue['postePublic']], dtype=bool
+            )
 
-        _meteorology_stations = (
-            meteorology_stations[mask]['id'].values.tolist()
-        )
+        _meteorology_stations = ids[mask].tolist()
     else:
         _meteorology_stations = []
 
     return _meteorology_stations
 
 
+def configure_catalogue(
+        directory: str = None, ttl: float = None, max_workers: int = None
+) -> None:
+    """Configure the on-disk cache used to store the catalogue of
+    meteorological stations collected from MeteoFrance, and how it is
+    collected.
+
+    :Parameters:
+
+        directory: `str`, optional
+            The file path to the directory where to store the cached
+            catalogue. If not provided, the current value is kept
+            (default value is the *database* directory of the module).
+
+        ttl: `float`, optional
+            The time to live (in seconds) of the cached catalogue, beyond
+            which it is collected again from MeteoFrance. If not provided,
+            the current value is kept (default value is one week, i.e.
+            `604800`).
+
+        max_workers: `int`, optional
+            The maximum number of departements queried concurrently when
+            collecting the catalogue (requests remain subject to the
+            request budget, see `configure_rate_limit`). If not provided,
+            the current value is kept (default value is `4`).
+
+    :Returns:
+
+        `None`
+
+    **Examples**
+
+    Refreshing the catalogue of stations daily:
+
+    >>> configure_catalogue(ttl=24 * 3600)
+    """
+    global _meteorology_catalogue
+
+    if directory is not None:
+        _catalogue_settings['directory'] = directory
+        # discard catalogue loaded from previous directory
+        _meteorology_catalogue = None
+    if ttl is not None:
+        _catalogue_settings['ttl'] = ttl
+    if max_workers is not None:
+        _catalogue_settings['max_workers'] = max_workers
+
+
 def get_meteorology(
         variables: list, station_id: int, api_key: str,
         start: str = None, end: str = None,
@@ -316,15 +726,13 @@ def get_meteorology(
             If no data is available on MeteoFrance, `None` is returned.
     """
     if check_station_id:
-        # collect list of meteorological stations (if not already collected)
-        meteorology_stations = (
-            _meteorology_stations if _meteorology_stations is not None
-            else _set_and_get_meteorology_stations(
-                api_key=api_key,
-                station_types=(0, 1, 2) if realtime_only else None,
-                public_stations_only=public_only,
-                open_stations_only=open_only
-            )
+        # collect list of meteorological stations (catalogue is only
+        # collected once, so filtering it again each time is cheap)
+        meteorology_stations = _set_and_get_meteorology_stations(
+            api_key=api_key,
+            station_types=(0, 1, 2) if realtime_only else None,
+            public_stations_only=public_only,
+            open_stations_only=open_only
         )
 
         # check station ID is available
@@ -398,58 +806,43 @@ def get_meteorology(
         | {var: pd.Series(dtype='float64') for var in list(set(variables))}
     )
 
-    # check if period is over multiple calendar years
+    # split period into calendar years (one order per year)
     if end_date.year > start_date.year:
-        # first year
-        df = pd.concat(
+        periods = (
+            # first year
             [
-                df,
-                _get_dataframe(
-                    variables=variables, station_id=station_id,
-                    start=start_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                    end=f'{start_date.year}-12-31T00:00:00Z',
-                    api_key=api_key
+                (
+                    start_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    f'{start_date.year}-12-31T00:00:00Z'
                 )
             ]
-        )
-
-        # years in between
-        for yr in range(start_date.year + 1, end_date.year):
-            df = pd.concat(
-                [
-                    df,
-                    _get_dataframe(
-                        variables=variables, station_id=station_id,
-                        start=f'{yr}-01-01T00:00:00Z',
-                        end=f'{yr}-12-31T00:00:00Z',
-                        api_key=api_key
-                    )
-                ]
-            )
-
-        # last year
-        df = pd.concat(
-            [
-                df,
-                _get_dataframe(
-                    variables=variables, station_id=station_id,
-                    start=f'{end_date.year}-01-01T00:00:00Z',
-                    end=end_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                    api_key=api_key
+            # years in between
+            + [
+                (f'{yr}-01-01T00:00:00Z', f'{yr}-12-31T00:00:00Z')
+                for yr in range(start_date.year + 1, end_date.year)
+            ]
+            # last year
+            + [
+                (
+                    f'{end_date.year}-01-01T00:00:00Z',
+                    end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
                 )
             ]
         )
     else:
-        df = pd.concat(
-            [
-                df,
-                _get_dataframe(
-                    variables=variables, station_id=station_id,
-                    start=start_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                    end=end_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                    api_key=api_key
-                )
-            ]
+        periods = [
+            (
+                start_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
+            )
+        ]
+
+    # submit all orders at once and collect them as they complete
+    df = pd.concat(
+        [df] + _get_dataframes(
+            variables=variables, station_id=station_id,
+            periods=periods, api_key=api_key
         )
+    )
 
     return df.reset_index(drop=True)
@@ -1,9 +1,9 @@
 import os
 import pathlib
-import numpy as np
 import pandas as pd
 
 from .collect import get_meteorology
+from mygardenia._prn import _write_prn_file
 
 
 _variable_mapping = {
@@ -26,7 +26,7 @@ def _save_df_as_prn_files(
         df: pd.DataFrame, variables: list, 
         working_dir: str, filename: str = None,
         start: str = None, end: str = None, freq: str = 'D'
-) -> None:
+) -> dict:
     # deal with working directory
     _manage_working_directory(working_dir)
 
@@ -40,30 +40,28 @@ def _save_df_as_prn_files(
         else pd.to_datetime(end)
     )
 
-    df = df.set_index('DATE')
-    df = df.reindex(pd.date_range(start, end, freq=freq), fill_value=np.nan)
-    df = df.reset_index(names='Date')
+    dates = pd.date_range(start, end, freq=freq)
+    df = df.set_index('DATE').reindex(dates)
 
-    # convert to "excel" date for Gardenia
-    df['Date'] = df['Date'].dt.strftime('%d/%m/%Y')
-
-    # save each variable as a PRN file
+    # save each variable as a PRN file (with "excel" dates for Gardenia)
+    written = {}
     for var in variables:
         # try renaming variable to plain text
         v = _variable_mapping.get(var, var)
-        df = df.rename(columns={var: v})
 
         # save to PRN file
-        df[['Date', v]].to_csv(
+        written[var] = _write_prn_file(
             os.sep.join(
                 [
                     working_dir, "data",
                     filename.format(var) if filename else f"my-{var}.prn"
                 ]
             ),
-            index=False, sep='\t'
+            dates, {v: df[var].values}
         )
 
+    return written
+
 
 def save_meteorology(
         variables: list, station_id: int, api_key: str,
@@ -142,6 +140,13 @@ def save_meteorology(
             Whether to check if the station ID corresponds to a public
             station. If not provided, set to default value `True`. This
             parameter is only relevant if *check_station_id* is `True`.
+
+    :Returns:
+
+        `dict`
+            Whether the PRN file of each variable (as keys) was written,
+            i.e. `False` if it already existed with the same content (in
+            which case it is left untouched).
     """
     # check that filename contains curly braces
     if filename and ('{}' not in filename):
@@ -158,7 +163,7 @@ def save_meteorology(
     )
 
     # store as PRN file(s)
-    _save_df_as_prn_files(
+    return _save_df_as_prn_files(
         df=df, variables=variables, 
         working_dir=working_dir, filename=filename, 
         start=start, end=end
@@ -1,7 +1,6 @@
-import requests
 import geopandas as gpd
 
-from myhubeau.collect import _get_dataframe
+from myhubeau.collect import _get_dataframe, _get
 
 
 # collect list of hydrometric stations still operating as dataframe
@@ -32,7 +31,7 @@ for code in gdf['code_station'].values:
         f"https://hubeau.eaufrance.fr/api/v1/hydrometrie/observations_tr?"
         f"code_entite={code}&grandeur_hydro=Q"
     )
-    r = requests.get(url)
+    r = _get(url)
 
     # check that query is a success
     if r.status_code in [200, 206]:
@@ -1,29 +1,17 @@
-import requests
-import pandas as pd
 import geopandas as gpd
 
-from myhubeau.collect import _get_dataframe
+from myhubeau.collect import _sweep_departements, _get
 
 
 # collect list of piezometric stations as dataframe
-df = None
-for departement in (
-        [f'{i:02}' for i in range(1, 96) if i != 20]
-        + ['2A', '2B', '971', '972', '973', '974', '976']
-):
-    df = pd.concat(
-        [
-            df, _get_dataframe(
-                endpoint="v1/niveaux_nappes",
-                operation="stations",
-                parameters={
-                    'fields': 'code_bss,bss_id,x,y',
-                    'code_departement': departement,
-                    'size': 10000
-                }
-            )
-        ]
-    )
+df = _sweep_departements(
+    endpoint="v1/niveaux_nappes",
+    operation="stations",
+    parameters={
+        'fields': 'code_bss,bss_id,x,y',
+        'size': 10000
+    }
+)
 
 # convert dataframe to WGS84 geodataframe
 gdf = gpd.GeoDataFrame(
@@ -42,7 +30,7 @@ for code in gdf['code_bss'].values:
         f"https://hubeau.eaufrance.fr/api/v1/niveaux_nappes/chroniques_tr?"
         f"code_bss={code}"
     )
-    r = requests.get(url)
+    r = _get(url)
 
     # check that query is a success
     if r.status_code in [200, 206]: